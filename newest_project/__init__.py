@@ -0,0 +1 @@
+"""Система автоматизированного развертывания виртуальных машин в кластере Proxmox VE."""
@@ -0,0 +1 @@
+"""Ядро системы развертывания."""
@@ -0,0 +1 @@
+"""Базовые модули системы развертывания."""
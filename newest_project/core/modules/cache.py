@@ -0,0 +1,380 @@
+"""Модуль кэширования.
+
+Простой in-memory кэш с TTL и необязательным сохранением на диск,
+используется всеми менеджерами для снижения числа обращений к Proxmox API.
+"""
+
+import heapq
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .logger import get_logger
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    """Одна запись кэша.
+
+    slots=True: поля лежат по фиксированным смещениям без __dict__ —
+    меньше памяти на запись и быстрее доступ на горячем пути get().
+    """
+
+    value: Any
+    timestamp: float
+    ttl: Optional[float] = None
+    hits: int = 0
+    stale_ttl: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        """Проверить, что запись свежая (в пределах ttl)."""
+        if self.ttl is None:
+            return True
+        return time.time() - self.timestamp <= self.ttl
+
+    def is_expired(self) -> bool:
+        """Проверить, истек ли срок жизни записи.
+
+        Запись с stale_ttl живет дольше ttl: между ними она не свежая,
+        но еще пригодна как fallback при недоступности API.
+        """
+        limit = self.stale_ttl if self.stale_ttl is not None else self.ttl
+        if limit is None:
+            return False
+        return time.time() - self.timestamp > limit
+
+
+class Cache:
+    """In-memory кэш с TTL и необязательной персистентностью."""
+
+    # Число WAL-записей, после которого журнал сворачивается в снимок.
+    WAL_COMPACT_THRESHOLD = 1000
+
+    def __init__(self, cache_dir: Optional[str] = None, default_ttl: float = 300):
+        self.cache: Dict[str, CacheEntry] = {}
+        # Индекс ключей по первому компоненту ('vm_status:n1:100' ->
+        # 'vm_status'): delete_prefix обходит только ключи своей группы,
+        # а не весь кэш.
+        self._keys_by_component: Dict[str, set] = defaultdict(set)
+        # Мин-куча (момент истечения, ключ): уборка снимает только
+        # реально просроченную верхушку вместо обхода всего словаря.
+        # Перезаписанные ключи оставляют в куче устаревшие элементы —
+        # при выталкивании они сверяются с актуальной записью.
+        self._expiry_heap: list = []
+        self.default_ttl = default_ttl
+        self.cache_dir = cache_dir
+        self.cache_file = os.path.join(cache_dir, "cache.json") if cache_dir else None
+        self.wal_file = os.path.join(cache_dir, "cache.wal") if cache_dir else None
+        # Журнал мутаций держится открытым: каждая запись — один append
+        # строки JSON, а не пересериализация всего кэша.
+        self._wal_fd = None
+        self._wal_count = 0
+        self.logger = get_logger()
+        if self.cache_file:
+            self._load_from_disk()
+            self._open_wal()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Получить значение по ключу или default, если запись отсутствует/истекла."""
+        # Уборка запускается только когда верхушка кучи действительно
+        # истекла — чтение больше не платит O(N) за каждый вызов.
+        now = time.time()
+        heap = self._expiry_heap
+        if heap and heap[0][0] <= now:
+            self._cleanup_expired()
+        # Один поиск в словаре и проверка свежести по месту — без
+        # двойного lookup (in + []) и вызова метода на каждый get.
+        entry = self.cache.get(key)
+        if entry is not None:
+            ttl = entry.ttl
+            if ttl is None or now - entry.timestamp <= ttl:
+                entry.hits += 1
+                return entry.value
+            if entry.is_expired():
+                del self.cache[key]
+        return default
+
+    def get_with_status(self, key: str) -> Tuple[Any, bool]:
+        """Получить значение вместе с признаком свежести.
+
+        Возвращает (value, is_fresh). Несвежая, но не истекшая запись
+        (в окне stale_ttl) возвращается с is_fresh=False — вызывающая
+        сторона может отдать ее как fallback и обновить в фоне.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None, False
+        if entry.is_expired():
+            del self.cache[key]
+            return None, False
+        entry.hits += 1
+        return entry.value, entry.is_fresh()
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            stale_ttl: Optional[float] = None) -> None:
+        """Сохранить значение с указанным TTL (по умолчанию default_ttl).
+
+        stale_ttl задает окно, в котором несвежая запись еще доступна
+        через get_with_status.
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        entry = CacheEntry(value=value, timestamp=time.time(), ttl=ttl,
+                           stale_ttl=stale_ttl)
+        self.cache[key] = entry
+        self._keys_by_component[key.partition(":")[0]].add(key)
+        self._push_expiry(key, entry)
+        self._append_wal("set", key, entry)
+
+    def multi_get(self, keys) -> Dict[str, Any]:
+        """Получить значения по списку ключей одним вызовом.
+
+        Возвращает словарь только по свежим записям. Накладные расходы
+        (проверки TTL, инкременты) амортизируются на весь пакет — для
+        будущих сетевых бэкендов это один round-trip вместо N.
+        """
+        result: Dict[str, Any] = {}
+        get_entry = self.cache.get
+        for key in keys:
+            entry = get_entry(key)
+            if entry is not None and entry.is_fresh():
+                entry.hits += 1
+                result[key] = entry.value
+        return result
+
+    def multi_set(self, items: Dict[str, Any], ttl: Optional[float] = None,
+                  stale_ttl: Optional[float] = None) -> None:
+        """Сохранить пакет значений с общим TTL и одним сбросом на диск."""
+        if ttl is None:
+            ttl = self.default_ttl
+        now = time.time()
+        for key, value in items.items():
+            entry = CacheEntry(value=value, timestamp=now, ttl=ttl,
+                               stale_ttl=stale_ttl)
+            self.cache[key] = entry
+            self._keys_by_component[key.partition(":")[0]].add(key)
+            self._push_expiry(key, entry)
+            self._append_wal("set", key, entry)
+
+    def delete(self, key: str) -> bool:
+        """Удалить запись; вернуть True, если запись существовала."""
+        if key in self.cache:
+            del self.cache[key]
+            self._keys_by_component[key.partition(":")[0]].discard(key)
+            self._append_wal("delete", key)
+            return True
+        return False
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Удалить все записи с ключами, начинающимися с prefix.
+
+        Кандидаты берутся из индекса по первому компоненту ключа —
+        O(размера группы) вместо обхода всего кэша. Возвращает число
+        удаленных записей.
+        """
+        component, sep, _ = prefix.partition(":")
+        if sep:
+            candidates = self._keys_by_component.get(component)
+            if not candidates:
+                return 0
+            keys = [key for key in candidates if key.startswith(prefix)]
+        else:
+            keys = [key for key in self.cache if key.startswith(prefix)]
+        return sum(1 for key in keys if self.delete(key))
+
+    def exists(self, key: str) -> bool:
+        """Проверить наличие непросроченной записи."""
+        entry = self.cache.get(key)
+        return entry is not None and not entry.is_expired()
+
+    def clear(self) -> None:
+        """Очистить кэш полностью."""
+        self.cache.clear()
+        self._keys_by_component.clear()
+        self._expiry_heap.clear()
+        if self.cache_file:
+            # Пустой кэш — компактный снимок выгоднее записи в журнал.
+            self._compact()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить сводную статистику по кэшу."""
+        total_hits = sum(entry.hits for entry in self.cache.values())
+        return {
+            "entries": len(self.cache),
+            "total_hits": total_hits,
+        }
+
+    def _push_expiry(self, key: str, entry: CacheEntry) -> None:
+        """Поставить запись в очередь на истечение."""
+        limit = entry.stale_ttl if entry.stale_ttl is not None else entry.ttl
+        if limit is not None:
+            heapq.heappush(self._expiry_heap, (entry.timestamp + limit, key))
+
+    def _cleanup_expired(self) -> None:
+        """Удалить просроченные записи с верхушки кучи — O(k log N)."""
+        heap = self._expiry_heap
+        now = time.time()
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            # Ключ мог быть перезаписан или удален после постановки в
+            # кучу — удаляется только действительно просроченная запись.
+            if entry is not None and entry.is_expired():
+                del self.cache[key]
+                self._keys_by_component[key.partition(":")[0]].discard(key)
+                self._append_wal("delete", key)
+
+    def _open_wal(self) -> None:
+        """Открыть журнал мутаций на дозапись."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._wal_fd = open(self.wal_file, "a", encoding="utf-8")
+        except OSError as exc:
+            self.logger.log_warning(f"Не удалось открыть журнал кэша: {exc}")
+            self._wal_fd = None
+
+    def _append_wal(self, op: str, key: str,
+                    entry: Optional[CacheEntry] = None) -> None:
+        """Дописать мутацию в журнал — O(размера записи), а не всего кэша."""
+        if self._wal_fd is None:
+            return
+        record: Dict[str, Any] = {"op": op, "key": key}
+        if entry is not None:
+            record.update(
+                value=entry.value,
+                timestamp=entry.timestamp,
+                ttl=entry.ttl,
+                stale_ttl=entry.stale_ttl,
+            )
+        try:
+            self._wal_fd.write(json.dumps(record) + "\n")
+            self._wal_fd.flush()
+        except (TypeError, ValueError):
+            # Несериализуемые значения живут только в памяти — как и
+            # раньше при полном снимке.
+            return
+        except OSError as exc:
+            self.logger.log_warning(f"Не удалось записать журнал кэша: {exc}")
+            return
+        self._wal_count += 1
+        if self._wal_count >= self.WAL_COMPACT_THRESHOLD:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Свернуть журнал: записать снимок кэша и начать журнал заново."""
+        self._save_to_disk()
+        if self._wal_fd is not None:
+            try:
+                self._wal_fd.close()
+            except OSError:
+                pass
+            self._wal_fd = None
+        if self.wal_file:
+            try:
+                self._wal_fd = open(self.wal_file, "w", encoding="utf-8")
+            except OSError as exc:
+                self.logger.log_warning(f"Не удалось очистить журнал кэша: {exc}")
+        self._wal_count = 0
+
+    def close(self) -> None:
+        """Свернуть журнал и закрыть файлы кэша."""
+        if self.cache_file:
+            self._compact()
+        if self._wal_fd is not None:
+            try:
+                self._wal_fd.close()
+            except OSError:
+                pass
+            self._wal_fd = None
+
+    def _save_to_disk(self) -> None:
+        """Сохранить кэш на диск."""
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data = {}
+            for key, entry in self.cache.items():
+                try:
+                    json.dumps(entry.value)
+                except (TypeError, ValueError):
+                    continue
+                data[key] = {
+                    "value": entry.value,
+                    "timestamp": entry.timestamp,
+                    "ttl": entry.ttl,
+                    "stale_ttl": entry.stale_ttl,
+                }
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except OSError as exc:
+            self.logger.log_warning(f"Не удалось сохранить кэш на диск: {exc}")
+
+    def _load_from_disk(self) -> None:
+        """Загрузить кэш с диска: снимок, затем повтор журнала."""
+        if not self.cache_file:
+            return
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for key, raw in data.items():
+                    entry = CacheEntry(
+                        value=raw.get("value"),
+                        timestamp=raw.get("timestamp", 0.0),
+                        ttl=raw.get("ttl"),
+                        stale_ttl=raw.get("stale_ttl"),
+                    )
+                    self.cache[key] = entry
+                    self._keys_by_component[key.partition(":")[0]].add(key)
+                    self._push_expiry(key, entry)
+            except (OSError, ValueError) as exc:
+                self.logger.log_warning(f"Не удалось загрузить кэш с диска: {exc}")
+        self._replay_wal()
+
+    def _replay_wal(self) -> None:
+        """Применить к снимку мутации из журнала."""
+        if not self.wal_file or not os.path.exists(self.wal_file):
+            return
+        try:
+            with open(self.wal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Оборванная последняя строка после падения —
+                        # журнал дальше не читается.
+                        break
+                    key = record.get("key")
+                    if record.get("op") == "set" and key is not None:
+                        entry = CacheEntry(
+                            value=record.get("value"),
+                            timestamp=record.get("timestamp", 0.0),
+                            ttl=record.get("ttl"),
+                            stale_ttl=record.get("stale_ttl"),
+                        )
+                        self.cache[key] = entry
+                        self._keys_by_component[key.partition(":")[0]].add(key)
+                        self._push_expiry(key, entry)
+                    elif record.get("op") == "delete" and key is not None:
+                        self.cache.pop(key, None)
+                        self._keys_by_component[key.partition(":")[0]].discard(key)
+        except OSError as exc:
+            self.logger.log_warning(f"Не удалось прочитать журнал кэша: {exc}")
+
+
+_global_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """Получить глобальный экземпляр кэша."""
+    global _global_cache
+    if _global_cache is None:
+        _global_cache = Cache()
+    return _global_cache
@@ -0,0 +1,78 @@
+"""Модуль логирования.
+
+Единая точка вывода сообщений для всех модулей системы развертывания.
+"""
+
+import logging
+import sys
+from typing import Optional
+
+
+class Logger:
+    """Обертка над стандартным logging с доменными методами."""
+
+    def __init__(self, name: str = "deploy_stand", level: int = logging.INFO):
+        self.logger = logging.getLogger(name)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(
+                logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+            )
+            self.logger.addHandler(handler)
+        self.logger.setLevel(level)
+
+    def log_debug(self, message: str) -> None:
+        """Отладочное сообщение."""
+        self.logger.debug(message)
+
+    def log_info(self, message: str) -> None:
+        """Информационное сообщение."""
+        self.logger.info(message)
+
+    def log_warning(self, message: str) -> None:
+        """Предупреждение."""
+        self.logger.warning(message)
+
+    def log_error(self, message: str) -> None:
+        """Сообщение об ошибке."""
+        self.logger.error(message)
+
+    def isEnabledFor(self, level: int) -> bool:
+        """Проверить, включен ли уровень логирования."""
+        return self.logger.isEnabledFor(level)
+
+    def log_cache_operation(self, operation: str, key: str, hit: Optional[bool] = None) -> None:
+        """Записать операцию с кэшем."""
+        suffix = ""
+        if hit is not None:
+            suffix = " (попадание)" if hit else " (промах)"
+        self.logger.debug(f"Кэш: {operation} {key}{suffix}")
+
+    def log_validation_error(self, context: str, message: str, details: str = "") -> None:
+        """Записать ошибку валидации."""
+        text = f"Ошибка валидации [{context}]: {message}"
+        if details:
+            text += f" — {details}"
+        self.logger.error(text)
+
+    def log_bridge_creation(self, bridge_name: str, user: str, node: str) -> None:
+        """Записать создание сетевого моста."""
+        self.logger.info(f"Создан bridge {bridge_name} для {user} на узле {node}")
+
+    def log_vm_operation(self, operation: str, vmid: int, node: str, status: str = "") -> None:
+        """Записать операцию над виртуальной машиной."""
+        text = f"VM {vmid} на {node}: {operation}"
+        if status:
+            text += f" ({status})"
+        self.logger.info(text)
+
+
+_global_logger: Optional[Logger] = None
+
+
+def get_logger() -> Logger:
+    """Получить глобальный экземпляр логгера."""
+    global _global_logger
+    if _global_logger is None:
+        _global_logger = Logger()
+    return _global_logger
@@ -0,0 +1,369 @@
+"""Модуль управления сетевой конфигурацией.
+
+Разбирает сетевые алиасы вида ``name`` или ``name.vlan``, генерирует имена
+мостов и qemu-строки сетевых интерфейсов, кэширует соответствия
+алиас -> bridge для каждого пользователя.
+"""
+
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .cache import Cache
+from .logger import Logger, get_logger
+
+# Допустимые символы имени моста. Таблица для str.translate удаляет все
+# разрешенные символы: непустой остаток означает недопустимый символ, и вся
+# проверка выполняется одним C-вызовом вместо регулярного выражения.
+_ALLOWED = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-"
+_DISALLOW_TABLE = str.maketrans("", "", _ALLOWED)
+
+
+class _CK(IntEnum):
+    """Индексы счетчиков мостов."""
+
+    DEFAULT = 0
+    INET = 1
+    HQ = 2
+    DMZ = 3
+
+
+# Соответствие алиас -> счетчик мостов: один поиск по хэшу вместо цепочки
+# сравнений строк и проверок членства в списках.
+_COUNTER_KEY_MAP = {
+    "inet": _CK.INET,
+    "internet": _CK.INET,
+    "ext": _CK.INET,
+    "hq": _CK.HQ,
+    "headquarters": _CK.HQ,
+    "corp": _CK.HQ,
+    "dmz": _CK.DMZ,
+    "demilitarized": _CK.DMZ,
+}
+
+
+@dataclass
+class NetworkConfig:
+    """Конфигурация одного сетевого интерфейса VM."""
+
+    bridge: str
+    model: str = "virtio"
+    vlan_id: Optional[int] = None
+    mac_address: Optional[str] = None
+
+
+@dataclass
+class BridgeAlias:
+    """Разобранный сетевой алиас."""
+
+    original_alias: str
+    bridge_name: str
+    vlan_id: Optional[int] = None
+
+
+class BridgeMappingCache:
+    """Кэш соответствий алиас -> bridge для пары (пользователь, узел)."""
+
+    def __init__(self, cache: Cache):
+        self.cache = cache
+        # Вторичный индекс ключей по пользователю: инвалидация не требует
+        # полного обхода кэша.
+        self._keys_by_user: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _make_key(user: str, node: str) -> str:
+        return f"bridge_mapping:{user}:{node}"
+
+    def get_bridge_mapping(self, user: str, node: str) -> Dict[str, str]:
+        """Получить сохраненное соответствие для пользователя на узле."""
+        return self.cache.get(self._make_key(user, node), {})
+
+    def set_bridge_mapping(self, user: str, node: str, mapping: Dict[str, str], ttl: float = 600) -> None:
+        """Сохранить соответствие для пользователя на узле."""
+        key = self._make_key(user, node)
+        self.cache.set(key, mapping, ttl=ttl)
+        self._keys_by_user.setdefault(user, set()).add(key)
+
+    def get_many(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, str]]:
+        """Получить соответствия сразу для нескольких пар (пользователь, узел).
+
+        Один проход по парам вместо отдельного обращения к кэшу на каждую
+        пару из внешнего цикла.
+        """
+        cache_get = self.cache.get
+        return {
+            (user, node): cache_get(self._make_key(user, node), {})
+            for user, node in pairs
+        }
+
+    def clear(self, user: Optional[str] = None) -> int:
+        """Удалить соответствия (все или одного пользователя); вернуть число удаленных."""
+        if user is None:
+            users = list(self._keys_by_user)
+        else:
+            users = [user] if user in self._keys_by_user else []
+        deleted = 0
+        for name in users:
+            for key in self._keys_by_user.pop(name):
+                if self.cache.delete(key):
+                    deleted += 1
+        return deleted
+
+
+class NetworkManager:
+    """Менеджер сетевых алиасов и мостов."""
+
+    # Алиас: имя моста и необязательный VLAN через точку, например "hq.100".
+    alias_pattern = re.compile(r"^([a-zA-Z0-9._-]+?)(?:\.(\d+))?$")
+
+    def __init__(self, cache: Optional[Cache] = None, logger: Optional[Logger] = None):
+        self.logger = logger or get_logger()
+        self.cache = cache or Cache()
+        self.bridge_mapping_cache = BridgeMappingCache(self.cache)
+        # Счетчики номеров мостов по назначению сети, индексируются _CK.
+        self.bridge_counters = [1000, 2000, 1000, 3000]
+
+    def parse_bridge_alias(self, alias: str) -> Optional[BridgeAlias]:
+        """Разобрать алиас вида ``name`` или ``name.vlan``."""
+        if not alias:
+            return None
+        # strip() выделяет новую строку даже без изменений; в типичном случае
+        # алиас уже чистый, поэтому сначала дешевая проверка краев.
+        if alias[0].isspace() or alias[-1].isspace():
+            alias = alias.strip()
+            if not alias:
+                return None
+        match = self.alias_pattern.match(alias)
+        if not match:
+            self.logger.log_validation_error("bridge_alias", "Некорректный алиас", alias)
+            return None
+        bridge_name, vlan_part = match.group(1), match.group(2)
+        vlan_id = None
+        if vlan_part:
+            # Регулярное выражение гарантирует только цифры — int() не упадет.
+            vlan_id = int(vlan_part)
+            if not 1 <= vlan_id <= 4094:
+                self.logger.log_validation_error("bridge_alias", "VLAN вне диапазона 1-4094", alias)
+                return None
+        return BridgeAlias(original_alias=alias, bridge_name=bridge_name, vlan_id=vlan_id)
+
+    def _parse_fast(self, alias: str) -> Optional[Tuple[str, Optional[int]]]:
+        """Быстрый разбор алиаса без аллокации BridgeAlias.
+
+        Для путей, которые только читают имя моста и VLAN (статистика,
+        проверки), кортеж заметно дешевле dataclass-объекта.
+        """
+        if not alias:
+            return None
+        if alias[0].isspace() or alias[-1].isspace():
+            alias = alias.strip()
+            if not alias:
+                return None
+        bridge_name, sep, vlan_part = alias.rpartition(".")
+        vlan_id: Optional[int] = None
+        if sep and vlan_part.isdigit():
+            vlan_id = int(vlan_part)
+            if not 1 <= vlan_id <= 4094:
+                return None
+        else:
+            bridge_name = alias
+        if not bridge_name or bridge_name.translate(_DISALLOW_TABLE):
+            return None
+        return bridge_name, vlan_id
+
+    def generate_mac_address(self) -> str:
+        """Сгенерировать MAC-адрес в диапазоне QEMU (52:54:00)."""
+        suffix = os.urandom(3).hex()
+        return f"52:54:00:{suffix[0:2]}:{suffix[2:4]}:{suffix[4:6]}"
+
+    def generate_qemu_network_string(self, network_config: NetworkConfig) -> str:
+        """Собрать строку сетевого интерфейса для qemu-конфигурации."""
+        result = f"model={network_config.model},bridge={network_config.bridge},firewall=1"
+        if network_config.vlan_id:
+            result += f",tag={network_config.vlan_id}"
+        if network_config.mac_address:
+            result += f",macaddr={network_config.mac_address}"
+        return result
+
+    def generate_bridge_name(self, base_alias: str) -> str:
+        """Сгенерировать имя моста для алиаса.
+
+        Явные имена vmbr* возвращаются как есть, остальные получают номер
+        из счетчика соответствующего диапазона.
+        """
+        if base_alias.startswith("vmbr"):
+            return base_alias
+        index = _COUNTER_KEY_MAP.get(base_alias, _CK.DEFAULT)
+        number = self.bridge_counters[index]
+        self.bridge_counters[index] = number + 1
+        return f"vmbr{number}"
+
+    def resolve_bridge_aliases(self, user: str, aliases: List[str], node: str) -> Dict[str, str]:
+        """Отобразить алиасы пользователя на имена мостов узла.
+
+        Использует сохраненное соответствие из кэша; для новых алиасов
+        генерирует имя моста и дописывает его в соответствие.
+        """
+        # Локальные ссылки на методы логгера: в цикле по алиасам это
+        # экономит по два поиска атрибутов на каждый вызов.
+        log_cache = self.logger.log_cache_operation
+        log_bridge = self.logger.log_bridge_creation
+        log_err = self.logger.log_validation_error
+
+        mapping = self.bridge_mapping_cache.get_bridge_mapping(user, node)
+        log_cache("get", f"bridge_mapping:{user}:{node}", hit=bool(mapping))
+        changed = False
+        for alias in aliases:
+            bridge_alias = self.parse_bridge_alias(alias)
+            if bridge_alias is None:
+                log_err("resolve_aliases", "Алиас пропущен", alias)
+                continue
+            if bridge_alias.bridge_name not in mapping:
+                bridge_name = self.generate_bridge_name(bridge_alias.bridge_name)
+                mapping[bridge_alias.bridge_name] = bridge_name
+                log_bridge(bridge_name, user, node)
+                changed = True
+        if changed:
+            self.bridge_mapping_cache.set_bridge_mapping(user, node, mapping)
+            log_cache("set", f"bridge_mapping:{user}:{node}")
+        return mapping
+
+    def resolve_bridge_aliases_bulk(
+        self, requests: List[Tuple[str, List[str], str]]
+    ) -> Dict[Tuple[str, str], Dict[str, str]]:
+        """Разрешить алиасы сразу для пакета запросов (user, aliases, node).
+
+        Все соответствия выбираются из кэша одним вызовом get_many, после
+        чего каждая пара дорабатывается локально — вместо N раздельных
+        обращений к кэшу из внешнего цикла.
+        """
+        log_bridge = self.logger.log_bridge_creation
+        log_err = self.logger.log_validation_error
+
+        mappings = self.bridge_mapping_cache.get_many(
+            [(user, node) for user, _, node in requests]
+        )
+        for user, aliases, node in requests:
+            mapping = mappings[(user, node)]
+            changed = False
+            for alias in aliases:
+                bridge_alias = self.parse_bridge_alias(alias)
+                if bridge_alias is None:
+                    log_err("resolve_aliases", "Алиас пропущен", alias)
+                    continue
+                if bridge_alias.bridge_name not in mapping:
+                    bridge_name = self.generate_bridge_name(bridge_alias.bridge_name)
+                    mapping[bridge_alias.bridge_name] = bridge_name
+                    log_bridge(bridge_name, user, node)
+                    changed = True
+            if changed:
+                self.bridge_mapping_cache.set_bridge_mapping(user, node, mapping)
+        return mappings
+
+    def create_vlan_aware_bridges(self, aliases: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Сгруппировать алиасы по мостам и определить, где нужен vlan-aware режим."""
+        bridge_groups: Dict[str, List[BridgeAlias]] = defaultdict(list)
+        vlan_flags: Dict[str, bool] = {}
+        for alias in aliases:
+            bridge_alias = self.parse_bridge_alias(alias)
+            if bridge_alias is None:
+                continue
+            base_bridge = bridge_alias.bridge_name
+            bridge_groups[base_bridge].append(bridge_alias)
+            vlan_flags[base_bridge] = vlan_flags.get(base_bridge, False) or bool(bridge_alias.vlan_id)
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for base_bridge, group in bridge_groups.items():
+            result[base_bridge] = {
+                "vlan_aware": vlan_flags[base_bridge],
+                "vlans": sorted({alias.vlan_id for alias in group if alias.vlan_id}),
+                "aliases": [alias.original_alias for alias in group],
+            }
+        return result
+
+    def optimize_network_config(self, networks: List[str]) -> List[str]:
+        """Удалить дубликаты сетей и отсортировать список."""
+        unique_networks = list(dict.fromkeys(networks))
+        unique_networks.sort()
+        return unique_networks
+
+    def validate_network_config(self, networks: List[str]) -> Dict[str, Any]:
+        """Проверить список сетевых алиасов.
+
+        Кроме ошибок и предупреждений возвращает разобранные алиасы
+        (ключ ``parsed``), чтобы вызывающий код не разбирал те же строки
+        повторно.
+        """
+        errors: List[str] = []
+        warnings: List[str] = []
+        parsed: List[Optional[BridgeAlias]] = []
+        for network in networks:
+            bridge_alias = self.parse_bridge_alias(network)
+            parsed.append(bridge_alias)
+            if bridge_alias is None:
+                errors.append(f"Некорректный алиас: {network}")
+            elif bridge_alias.vlan_id and bridge_alias.bridge_name.startswith("vmbr"):
+                warnings.append(f"VLAN поверх явного моста: {network}")
+        return {
+            "valid": not errors,
+            "errors": errors,
+            "warnings": warnings,
+            "parsed": parsed,
+        }
+
+    def get_network_statistics(self, networks: List[str]) -> Dict[str, Any]:
+        """Собрать статистику по списку сетевых алиасов."""
+        stats: Dict[str, Any] = {
+            "total_networks": len(networks),
+            "bridges": set(),
+            "invalid": 0,
+        }
+        # VLAN ID укладывается в 12 бит, поэтому множество VLAN хранится как
+        # битовая карта на 4096 бит (512 байт): вставка — пара целочисленных
+        # операций без аллокаций, объединение карт — побайтовое ИЛИ.
+        vlans_bitmap = bytearray(512)
+        for network in networks:
+            parsed = self._parse_fast(network)
+            if parsed is None:
+                stats["invalid"] += 1
+                continue
+            bridge_name, vlan_id = parsed
+            stats["bridges"].add(bridge_name)
+            if vlan_id:
+                vlans_bitmap[vlan_id >> 3] |= 1 << (vlan_id & 7)
+        vlans = [
+            vlan_id
+            for vlan_id in range(4096)
+            if vlans_bitmap[vlan_id >> 3] & (1 << (vlan_id & 7))
+        ]
+        stats["unique_bridges"] = len(stats["bridges"])
+        stats["unique_vlans"] = len(vlans)
+        stats["bridges"] = sorted(stats["bridges"])
+        stats["vlans"] = vlans
+        return stats
+
+    def _check_vlan_aware_needed(self, networks: List[str]) -> bool:
+        """Проверить, требуется ли vlan-aware режим хотя бы для одной сети."""
+        for network in networks:
+            parsed = self._parse_fast(network)
+            if parsed is not None and parsed[1]:
+                return True
+        return False
+
+    def clear_bridge_cache(self, user: Optional[str] = None) -> int:
+        """Сбросить кэш соответствий мостов (для всех или одного пользователя)."""
+        return self.bridge_mapping_cache.clear(user)
+
+
+_global_network_manager: Optional[NetworkManager] = None
+
+
+def get_network_manager() -> NetworkManager:
+    """Получить глобальный экземпляр менеджера сетей."""
+    global _global_network_manager
+    if _global_network_manager is None:
+        _global_network_manager = NetworkManager()
+    return _global_network_manager
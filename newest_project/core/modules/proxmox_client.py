@@ -0,0 +1,747 @@
+"""Модуль клиента Proxmox VE API.
+
+Обертка над proxmoxer с кэшированием часто запрашиваемых данных кластера
+(версия, список узлов, ресурсы) и универсальным вызовом произвольных
+методов API.
+"""
+
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from proxmoxer import ProxmoxAPI
+from proxmoxer.backends.https import JsonSerializer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .cache import Cache
+from .logger import Logger, get_logger
+from .validator import Validator
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, подставляющий таймаут (connect, read) в каждый запрос.
+
+    Без явного таймаута зависший узел блокирует вызов бесконечно; адаптер
+    гарантирует ограничение даже для кода, который таймаут не передает.
+    """
+
+    def __init__(self, *args: Any, timeout: tuple = (5, 30), **kwargs: Any):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request: Any, **kwargs: Any) -> Any:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _build_adapter(timeouts: tuple = (5, 30), max_retries: int = 5,
+                   pool_connections: int = 20,
+                   pool_maxsize: int = 50) -> TimeoutHTTPAdapter:
+    """Собрать адаптер с пулом, таймаутами и ограниченными повторами."""
+    return TimeoutHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        timeout=timeouts,
+        max_retries=Retry(
+            total=max_retries,
+            read=5,
+            status=5,
+            # Ошибка соединения не повторяется: неверный хост падает сразу.
+            connect=0,
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods={"GET", "HEAD", "PUT", "DELETE"},
+        ),
+    )
+
+
+# Общий HTTP-адаптер: один пул keep-alive соединений на все экземпляры
+# клиента, чтобы каждый вызов API не платил за TCP+TLS рукопожатие.
+_SHARED_ADAPTER = _build_adapter()
+
+# Маркер отрицательного результата: узел не найден, повторный запрос не
+# нужен до истечения короткого TTL.
+_SENTINEL_MISSING = "__node_missing__"
+
+
+class _OrjsonSerializer(JsonSerializer):
+    """Сериализатор ответов на orjson.
+
+    Для cluster/resources в сотни КБ orjson декодирует в 2-3 раза быстрее
+    stdlib json и создает меньше промежуточных строк.
+    """
+
+    def loads(self, response: Any) -> Any:
+        try:
+            return orjson.loads(response.content)["data"]
+        except (ValueError, KeyError, TypeError):
+            return {"errors": response.content}
+
+
+class _HttpxTransportSession:
+    """Транспорт поверх httpx с мультиплексированием HTTP/2.
+
+    Повторяет интерфейс session.request, который использует proxmoxer, но
+    гонит все запросы через один httpx.Client: множество мелких чтений
+    мультиплексируются в одном TLS-соединении вместо очереди HTTP/1.1.
+    """
+
+    class _AuthRequest:
+        """Минимальный объект запроса для протокола авторизации proxmoxer."""
+
+        __slots__ = ("method", "headers", "cert")
+
+        def __init__(self, method: str):
+            self.method = method
+            self.headers: Dict[str, str] = {}
+            self.cert = None
+
+    def __init__(self, auth: Any, verify_ssl: bool):
+        if httpx is None:
+            raise RuntimeError("Пакет httpx не установлен")
+        limits = httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=300,
+        )
+        timeout = httpx.Timeout(30.0)
+        try:
+            self._client = httpx.Client(
+                http2=True, limits=limits, timeout=timeout, verify=verify_ssl
+            )
+        except ImportError:
+            # Нет пакета h2 — работаем по HTTP/1.1, но с тем же пулом.
+            self._client = httpx.Client(
+                limits=limits, timeout=timeout, verify=verify_ssl
+            )
+        self._auth = auth
+        # Условные GET: ETag и последний удачный ответ по URL. При 304
+        # сервер не шлет тело, а мы не платим за повторную десериализацию.
+        self._etags: Dict[str, tuple] = {}
+
+    def request(self, method: str, url: str, params: Any = None, data: Any = None,
+                headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> Any:
+        verb = method.upper()
+        req = self._AuthRequest(verb)
+        if self._auth is not None:
+            self._auth(req)
+        merged = dict(headers or {})
+        merged.update(req.headers)
+        conditional = None
+        if verb == "GET":
+            conditional = self._etags.get(url)
+            if conditional is not None:
+                merged["If-None-Match"] = conditional[0]
+        cookies = None
+        get_cookies = getattr(self._auth, "get_cookies", None)
+        if get_cookies is not None:
+            try:
+                cookies = {
+                    cookie.name: cookie.value
+                    for cookie in get_cookies()
+                    if cookie.value
+                }
+            except AttributeError:
+                cookies = None
+        response = self._client.request(
+            method, url, params=params, data=data, headers=merged, cookies=cookies
+        )
+        if verb == "GET":
+            if response.status_code == 304 and conditional is not None:
+                return conditional[1]
+            etag = response.headers.get("ETag")
+            if etag and response.status_code == 200:
+                self._etags[url] = (etag, response)
+        return response
+
+    def close(self) -> None:
+        self._client.close()
+
+
+@dataclass
+class NodeInfo:
+    """Сводная информация об узле кластера."""
+
+    name: str
+    status: str
+    cpu_usage: float
+    memory_total: int
+    memory_used: int
+    uptime: int
+
+
+class ProxmoxClientInterface(ABC):
+    """Интерфейс клиента Proxmox API."""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def connect(self, host: str, user: str, password: Optional[str] = None,
+                token_name: Optional[str] = None, token_value: Optional[str] = None) -> bool:
+        """Установить соединение с кластером."""
+
+    @abstractmethod
+    def disconnect(self) -> None:
+        """Разорвать соединение."""
+
+    @abstractmethod
+    def is_connected(self) -> bool:
+        """Проверить состояние соединения."""
+
+    @abstractmethod
+    def api_call(self, *args: Any, **params: Any) -> Any:
+        """Выполнить произвольный вызов API."""
+
+
+class ProxmoxClient(ProxmoxClientInterface):
+    """Клиент Proxmox VE API с кэшированием."""
+
+    # Фиксированный набор атрибутов: экземпляр без __dict__ занимает меньше
+    # памяти, а доступ к self.proxmox/self.cache идет по фиксированному
+    # смещению.
+    __slots__ = (
+        "logger",
+        "cache",
+        "validator",
+        "verify_ssl",
+        "use_http2",
+        "_adapter",
+        "proxmox",
+        "connection_info",
+        "_healthcheck_interval",
+        "_last_healthcheck_ts",
+        "_method_cache",
+        "_ttls",
+        "_node_inflight",
+        "_inflight_lock",
+        "_inflight",
+        "_inflight_result",
+        "_node_info_objs",
+        "_stats",
+        "_batch_executor",
+    )
+
+    # TTL кэша по типу данных: версия меняется только при обновлении
+    # кластера, ресурсы отражают живое состояние VM и устаревают за секунды.
+    TTL_VERSION = 86400
+    TTL_NODES = 300
+    TTL_NODE_INFO = 120
+    TTL_RESOURCES = 30
+
+    def __init__(self, cache: Optional[Cache] = None, logger: Optional[Logger] = None,
+                 validator: Optional[Validator] = None, verify_ssl: bool = False,
+                 ttl_overrides: Optional[Dict[str, float]] = None,
+                 use_http2: bool = False,
+                 timeouts: tuple = (5, 30), max_retries: int = 5):
+        self.logger = logger or get_logger()
+        self.cache = cache or Cache()
+        self.validator = validator or Validator(self.logger)
+        self.verify_ssl = verify_ssl
+        self.use_http2 = use_http2 and httpx is not None
+        # Нестандартные таймауты/повторы получают собственный адаптер,
+        # конфигурация по умолчанию использует общий пул.
+        if timeouts == (5, 30) and max_retries == 5:
+            self._adapter = _SHARED_ADAPTER
+        else:
+            self._adapter = _build_adapter(timeouts, max_retries)
+        self.proxmox: Optional[ProxmoxAPI] = None
+        self.connection_info: Optional[Dict[str, Any]] = None
+        # Здоровье соединения проверяется живым запросом не чаще, чем раз
+        # в _healthcheck_interval секунд; между проверками is_connected
+        # ограничивается локальными полями.
+        self._healthcheck_interval = 30
+        self._last_healthcheck_ts = 0.0
+        # Кэш разрешенных цепочек api_call: путь -> связанный метод ресурса.
+        self._method_cache: Dict[tuple, Callable] = {}
+        self._ttls = {
+            "version": self.TTL_VERSION,
+            "nodes": self.TTL_NODES,
+            "node_info": self.TTL_NODE_INFO,
+            "resources": self.TTL_RESOURCES,
+        }
+        if ttl_overrides:
+            self._ttls.update(ttl_overrides)
+        # Дедупликация конкурентных запросов node_info по одному узлу.
+        self._node_inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        # Single-flight для кэшируемых геттеров: на ключ — один запрос в
+        # полете, остальные ждут его результат.
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_result: Dict[str, Any] = {}
+        # Готовые NodeInfo с собственным таймстемпом: повторные обращения к
+        # одному узлу в пределах TTL не пересобирают dataclass из словаря.
+        self._node_info_objs: Dict[str, tuple] = {}
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
+        # Счетчики попаданий/промахов кэша: инкремент int на горячем пути
+        # вместо форматирования строки лога на каждый запрос.
+        self._stats: Dict[str, int] = {
+            "version_hit": 0, "version_miss": 0,
+            "nodes_hit": 0, "nodes_miss": 0,
+            "node_info_hit": 0, "node_info_miss": 0,
+            "resources_hit": 0, "resources_miss": 0,
+        }
+
+    def connect(self, host: str, user: str, password: Optional[str] = None,
+                token_name: Optional[str] = None, token_value: Optional[str] = None) -> bool:
+        """Установить соединение с кластером Proxmox."""
+        host_clean, port = self._split_host_port(host)
+        kwargs = dict(
+            host=host_clean,
+            user=user,
+            port=port,
+            verify_ssl=self.verify_ssl,
+        )
+        if password:
+            kwargs["password"] = password
+        elif token_name and token_value:
+            kwargs["token_name"] = token_name
+            kwargs["token_value"] = token_value
+        else:
+            self.logger.log_error("Не заданы ни пароль, ни API-токен")
+            return False
+        try:
+            self.proxmox = ProxmoxAPI(**kwargs)
+            if orjson is not None:
+                self.proxmox._store["serializer"] = _OrjsonSerializer()
+            if self.use_http2:
+                # Замена транспорта на httpx: те же высокоуровневые методы,
+                # но мультиплексирование HTTP/2 поверх одного соединения.
+                self.proxmox._store["session"] = _HttpxTransportSession(
+                    self.proxmox._backend.auth, self.verify_ssl
+                )
+            else:
+                # proxmoxer 2.x создает собственную сессию; подключаем к ней
+                # общий адаптер, чтобы пул соединений разделялся всеми клиентами.
+                session = self.proxmox._store["session"]
+                session.mount("https://", self._adapter)
+                session.mount("http://", self._adapter)
+            # Проверочный запрос: неверные реквизиты должны падать здесь.
+            self.proxmox.version.get()
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось подключиться к {host}: {exc}")
+            self.proxmox = None
+            return False
+        self.connection_info = {"host": host_clean, "port": port, "user": user}
+        self._last_healthcheck_ts = time.time()
+        self.logger.log_info(f"Подключение к {host_clean}:{port} установлено")
+        return True
+
+    @staticmethod
+    def _split_host_port(host: str) -> tuple:
+        """Выделить хост и порт без полного urlparse.
+
+        urlparse строит ParseResult ради двух полей; простое разбиение
+        покрывает типичный случай, для IPv6-литералов остается запасной
+        путь через urlparse.
+        """
+        if ":" not in host:
+            return host, 8006
+        if host.count(":") == 1:
+            host_clean, _, port_s = host.rpartition(":")
+            return host_clean, int(port_s) if port_s.isdigit() else 8006
+        # IPv6-литерал — редкий случай, отдаем urlparse.
+        parsed = urlparse(f"http://{host}")
+        return parsed.hostname or host, parsed.port or 8006
+
+    def configure_pool(self, max_connections: int) -> None:
+        """Перенастроить пул HTTP-соединений под заданную конкурентность.
+
+        Массовые операции поверх тесного пула выбивают соединения
+        ('Connection pool is full, discarding connection') и платят за
+        повторные TCP+TLS рукопожатия; расширенный пул держит их
+        прогретыми. Для httpx-транспорта лимиты заданы в самом
+        транспорте — перенастройка не требуется.
+        """
+        self._adapter = _build_adapter(
+            pool_connections=max_connections, pool_maxsize=max_connections
+        )
+        if self.proxmox is None or self.use_http2:
+            return
+        session = self.proxmox._store["session"]
+        if hasattr(session, "mount"):
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+
+    def disconnect(self) -> None:
+        """Разорвать соединение с кластером."""
+        self.proxmox = None
+        self.connection_info = None
+        self._last_healthcheck_ts = 0.0
+        self._method_cache.clear()
+
+    def is_connected(self) -> bool:
+        """Проверить состояние соединения.
+
+        Быстрый путь — проверка локальных полей; живой запрос к API
+        выполняется только когда истек интервал heartbeat.
+        """
+        if self.proxmox is None or self.connection_info is None:
+            return False
+        now = time.time()
+        if now - self._last_healthcheck_ts <= self._healthcheck_interval:
+            return True
+        try:
+            self.proxmox.version.get()
+        except Exception as exc:
+            self.logger.log_warning(f"Соединение с Proxmox потеряно: {exc}")
+            return False
+        self._last_healthcheck_ts = now
+        return True
+
+    def api_call(self, *args: Any, **params: Any) -> Any:
+        """Выполнить произвольный вызов API.
+
+        Путь задается позиционными аргументами, последний из которых — HTTP
+        метод ресурса, например: ``api_call('nodes', node, 'qemu', vmid,
+        'config', 'get')``.
+        """
+        if self.proxmox is None:
+            raise RuntimeError("Нет соединения с Proxmox")
+        method = self._method_cache.get(args)
+        if method is None:
+            resource = self.proxmox
+            for part in args[:-1]:
+                if isinstance(part, str):
+                    resource = getattr(resource, part)
+                else:
+                    resource = resource(part)
+            method = getattr(resource, args[-1])
+            self._method_cache[args] = method
+        result = method(**params)
+        # Запись через API делает кэшированные списки устаревшими немедленно,
+        # не дожидаясь TTL — инвалидируем затронутые ключи.
+        if args[-1] in ("post", "put", "delete"):
+            self._invalidate_after_write(args)
+        return result
+
+    def api_call_many(self, calls: List[tuple]) -> List[Any]:
+        """Выполнить пакет вызовов API параллельно.
+
+        Каждый элемент ``calls`` — кортеж позиционных аргументов для
+        :meth:`api_call`. Вызовы раскладываются по пулу потоков поверх
+        общего пула соединений, так что пакет стоит один round-trip по
+        латентности, а не сумму последовательных. Результаты возвращаются
+        в исходном порядке; упавший вызов дает None.
+        """
+        if not calls:
+            return []
+        if len(calls) == 1:
+            try:
+                return [self.api_call(*calls[0])]
+            except Exception as exc:
+                self.logger.log_error(f"Ошибка вызова API {calls[0]}: {exc}")
+                return [None]
+
+        def _one(args: tuple) -> Any:
+            try:
+                return self.api_call(*args)
+            except Exception as exc:
+                self.logger.log_error(f"Ошибка вызова API {args}: {exc}")
+                return None
+
+        # Пул живет вместе с клиентом: потоки не пересоздаются на каждый
+        # пакет, а HTTP-соединения к узлам остаются прогретыми.
+        if self._batch_executor is None:
+            self._batch_executor = ThreadPoolExecutor(max_workers=16)
+        return list(self._batch_executor.map(_one, calls))
+
+    def _invalidate_after_write(self, args: tuple) -> None:
+        """Сбросить ключи кэша, затронутые операцией записи."""
+        self.cache.delete("cluster_resources")
+        self.cache.delete("cluster_resources:vm")
+        self.cache.delete("cluster_resources:node")
+        self.cache.delete("cluster_nodes")
+        if len(args) >= 2 and args[0] == "nodes":
+            self.cache.delete(f"node_info:{args[1]}")
+            self._node_info_objs.pop(args[1], None)
+
+    def _single_flight(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Выполнить fetch не более чем в одном потоке на ключ.
+
+        При истечении TTL всплеск конкурентных вызовов порождал по запросу
+        на каждый поток; теперь победитель делает один вызов API и
+        наполняет кэш, проигравшие ждут и читают его результат.
+        """
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            is_owner = event is None
+            if is_owner:
+                event = threading.Event()
+                self._inflight[key] = event
+        if not is_owner:
+            event.wait(timeout=60)
+            return self._inflight_result.get(key)
+        try:
+            result = fetch()
+            self._inflight_result[key] = result
+            return result
+        finally:
+            event.set()
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def get_version(self) -> Optional[Dict[str, Any]]:
+        """Получить версию Proxmox VE (кэшируется)."""
+        cached = self.cache.get("version")
+        if cached is not None:
+            self._stats["version_hit"] += 1
+            return cached
+        self._stats["version_miss"] += 1
+        return self._single_flight("version", self._fetch_version)
+
+    def _fetch_version(self) -> Optional[Dict[str, Any]]:
+        try:
+            version = self.proxmox.version.get()
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось получить версию: {exc}")
+            return None
+        self.cache.set("version", version, ttl=self._ttls["version"])
+        return version
+
+    def get_nodes(self) -> List[str]:
+        """Получить имена узлов кластера (кэшируется)."""
+        cached = self.cache.get("cluster_nodes")
+        if cached is not None:
+            self._stats["nodes_hit"] += 1
+            return cached
+        self._stats["nodes_miss"] += 1
+        return self._single_flight("cluster_nodes", self._fetch_nodes)
+
+    def _fetch_nodes(self) -> List[str]:
+        try:
+            nodes_info = self.proxmox.nodes.get()
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось получить список узлов: {exc}")
+            return []
+        nodes = list(filter(None, (node.get("name") for node in nodes_info)))
+        self.cache.set("cluster_nodes", nodes, ttl=self._ttls["nodes"])
+        return nodes
+
+    def get_node_info(self, node: str) -> Optional[NodeInfo]:
+        """Получить информацию об узле (кэшируется)."""
+        entry = self._node_info_objs.get(node)
+        if entry is not None:
+            created, info = entry
+            if time.time() - created <= self._ttls["node_info"]:
+                self._stats["node_info_hit"] += 1
+                return info
+            del self._node_info_objs[node]
+        cache_key = f"node_info:{node}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self._stats["node_info_hit"] += 1
+            if cached == _SENTINEL_MISSING:
+                return None
+            return self._remember_node_info(node, cached)
+        self._stats["node_info_miss"] += 1
+        # Один поток на узел выполняет запрос, конкуренты ждут его результат
+        # вместо лавины одинаковых обращений к API.
+        with self._inflight_lock:
+            event = self._node_inflight.get(node)
+            is_owner = event is None
+            if is_owner:
+                event = threading.Event()
+                self._node_inflight[node] = event
+        if not is_owner:
+            event.wait(timeout=30)
+            cached = self.cache.get(cache_key)
+            if cached is None or cached == _SENTINEL_MISSING:
+                return None
+            return self._remember_node_info(node, cached)
+        try:
+            # Один запрос cluster/resources наполняет кэш по всем узлам сразу —
+            # обход get_nodes + get_node_info стоит O(1) HTTP вместо O(N).
+            self._prime_node_cache()
+            cached = self.cache.get(cache_key)
+            if cached is None:
+                # Отрицательный результат тоже кэшируется: повторные запросы
+                # несуществующего узла не бьют по API до истечения TTL.
+                self.cache.set(cache_key, _SENTINEL_MISSING, ttl=30)
+                return None
+            return self._remember_node_info(node, cached)
+        finally:
+            event.set()
+            with self._inflight_lock:
+                self._node_inflight.pop(node, None)
+
+    def _prime_node_cache(self) -> None:
+        """Заполнить кэш node_info:* по всем узлам одним запросом."""
+        try:
+            resources = self.proxmox.cluster.resources.get(type="node")
+        except Exception as exc:
+            # Старые версии Proxmox или урезанные токены могут не отдавать
+            # cluster/resources — опрашиваем узлы параллельно по одному.
+            self.logger.log_warning(
+                f"cluster/resources недоступен ({exc}), опрашиваю узлы по отдельности"
+            )
+            self._prime_node_cache_fallback()
+            return
+        for resource in resources:
+            name = resource.get("node")
+            if not name:
+                continue
+            data = {
+                "name": name,
+                "status": resource.get("status", "unknown"),
+                "cpu_usage": resource.get("cpu", 0.0),
+                "memory_total": resource.get("maxmem", 0),
+                "memory_used": resource.get("mem", 0),
+                "uptime": resource.get("uptime", 0),
+            }
+            self.cache.set(f"node_info:{name}", data, ttl=self._ttls["node_info"])
+
+    def _prime_node_cache_fallback(self) -> None:
+        """Наполнить кэш per-node запросами, раскинутыми по пулу потоков.
+
+        Число воркеров согласовано с pool_maxsize общего адаптера, чтобы
+        параллельные запросы не выбивали соединения из пула.
+        """
+        nodes = self.get_nodes()
+        if not nodes:
+            return
+
+        def fetch(node: str):
+            try:
+                return node, self.proxmox.nodes(node).status.get()
+            except Exception as exc:
+                self.logger.log_error(f"Не удалось опросить узел {node}: {exc}")
+                return node, None
+
+        with ThreadPoolExecutor(max_workers=min(8, len(nodes))) as executor:
+            results = list(executor.map(fetch, nodes))
+        for node, status in results:
+            if status is None:
+                continue
+            data = {
+                "name": node,
+                "status": status.get("status", "unknown"),
+                "cpu_usage": status.get("cpu", 0.0),
+                "memory_total": status.get("memory", {}).get("total", 0),
+                "memory_used": status.get("memory", {}).get("used", 0),
+                "uptime": status.get("uptime", 0),
+            }
+            self.cache.set(f"node_info:{node}", data, ttl=self._ttls["node_info"])
+
+    def get_cluster_resources(self, resource_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Получить ресурсы кластера (кэшируется).
+
+        resource_type передается в API как фильтр (``vm``, ``node``,
+        ``storage``), чтобы не таскать и не кэшировать лишние строки.
+        """
+        key = "cluster_resources" if resource_type is None \
+            else f"cluster_resources:{resource_type}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._stats["resources_hit"] += 1
+            return cached
+        self._stats["resources_miss"] += 1
+        return self._single_flight(
+            key, lambda: self._fetch_cluster_resources(resource_type, key)
+        )
+
+    def _fetch_cluster_resources(self, resource_type: Optional[str],
+                                 key: str) -> List[Dict[str, Any]]:
+        try:
+            if resource_type is None:
+                resources = self.proxmox.cluster.resources.get()
+            else:
+                resources = self.proxmox.cluster.resources.get(type=resource_type)
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось получить ресурсы кластера: {exc}")
+            return []
+        self.cache.set(key, resources, ttl=self._ttls["resources"])
+        return resources
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Получить счетчики попаданий/промахов кэша клиента."""
+        return dict(self._stats)
+
+    def get_next_vmid(self) -> int:
+        """Подобрать следующий свободный VMID."""
+        resources = self.get_cluster_resources()
+        vmids = (
+            resource["vmid"]
+            for resource in resources
+            if resource.get("type") == "qemu" and isinstance(resource.get("vmid"), int)
+        )
+        return max(vmids, default=99) + 1
+
+    def _remember_node_info(self, node: str, data: Dict[str, Any]) -> NodeInfo:
+        """Собрать NodeInfo и запомнить готовый объект до истечения TTL."""
+        info = self._dict_to_node_info(data)
+        self._node_info_objs[node] = (time.time(), info)
+        return info
+
+    def _dict_to_node_info(self, data: Dict[str, Any]) -> NodeInfo:
+        """Собрать NodeInfo из кэшированного словаря."""
+        return NodeInfo(
+            name=data.get("name", ""),
+            status=data.get("status", "unknown"),
+            cpu_usage=data.get("cpu_usage", 0.0),
+            memory_total=data.get("memory_total", 0),
+            memory_used=data.get("memory_used", 0),
+            uptime=data.get("uptime", 0),
+        )
+
+
+class AsyncProxmoxClient:
+    """Асинхронный фасад над ProxmoxClient.
+
+    Блокирующие вызовы proxmoxer выполняются в ограниченном пуле потоков,
+    поэтому N параллельных запросов перекрываются по времени вместо
+    последовательного исполнения: asyncio.gather над 20 узлами стоит
+    max(задержек), а не их сумму.
+    """
+
+    def __init__(self, sync_client: ProxmoxClient, max_workers: int = 16):
+        self._sync = sync_client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def _run(self, fn: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def get_version(self) -> Optional[Dict[str, Any]]:
+        """Асинхронно получить версию Proxmox VE."""
+        return await self._run(self._sync.get_version)
+
+    async def get_nodes(self) -> List[str]:
+        """Асинхронно получить имена узлов кластера."""
+        return await self._run(self._sync.get_nodes)
+
+    async def get_node_info(self, node: str) -> Optional[NodeInfo]:
+        """Асинхронно получить информацию об узле."""
+        return await self._run(self._sync.get_node_info, node)
+
+    async def get_cluster_resources(
+            self, resource_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Асинхронно получить ресурсы кластера."""
+        return await self._run(self._sync.get_cluster_resources, resource_type)
+
+    async def api_call(self, *args: Any, **params: Any) -> Any:
+        """Асинхронно выполнить произвольный вызов API."""
+        return await self._run(partial(self._sync.api_call, *args, **params))
+
+    def close(self) -> None:
+        """Остановить пул потоков."""
+        self._executor.shutdown(wait=False)
+
+
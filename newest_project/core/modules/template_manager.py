@@ -0,0 +1,512 @@
+"""Модуль управления шаблонами виртуальных машин."""
+
+import functools
+import re
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Pattern
+
+from .cache import Cache, get_cache
+from .logger import Logger, get_logger
+from .proxmox_client import ProxmoxClient
+
+
+# Множитель для суффикса размера диска (в МБ).
+_SIZE_MULT = {"G": 1024, "M": 1, "T": 1024 * 1024}
+
+# Ключи дисковых устройств в конфигурации VM (scsi0, virtio1, ...).
+_DISK_KEY_RE = re.compile(r"^(?:scsi|ide|sata|virtio)\d+$")
+_DISK_SIZE_RE = re.compile(r"size=([\d.]+[GMTK]?)")
+
+
+class CachePolicy(IntEnum):
+    """TTL кэша по изменчивости данных (в секундах).
+
+    Списки шаблонов и конфигурации меняются часами — им LONG; статусы
+    меняются секундами — им SHORT. Единый TTL давал либо устаревшие
+    статусы, либо лишние повторные запросы.
+    """
+
+    SHORT = 10
+    NORMAL = 60
+    LONG = 3600
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_ci(pattern: str) -> Pattern[str]:
+    """Скомпилировать регистронезависимый шаблон поиска (с кэшем)."""
+    return re.compile(pattern, re.IGNORECASE)
+
+
+@dataclass(slots=True, frozen=True)
+class TemplateInfo:
+    """Информация о шаблоне VM."""
+
+    vmid: int
+    name: str
+    node: str
+    memory: int
+    cpus: int
+    disk_size: int
+    status: str
+    description: str = ""
+    # Узлы, где доступна та же реплика шаблона (общее хранилище в HA).
+    replica_nodes: tuple = ()
+    # Конфигурация шаблона была успешно прочитана при сборке объекта.
+    config_reachable: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class TemplateValidation:
+    """Результат проверки шаблона."""
+
+    valid: bool
+    errors: List[str]
+    warnings: List[str]
+
+
+class TemplateManager:
+    """Менеджер шаблонов VM в кластере Proxmox."""
+
+    def __init__(self, proxmox_client: ProxmoxClient,
+                 cache: Optional[Cache] = None,
+                 logger: Optional[Logger] = None):
+        self.proxmox_client = proxmox_client
+        self.cache = cache or get_cache()
+        self.logger = logger or get_logger()
+        # Мемоизация конфигураций (node, vmid) в рамках одной логической
+        # операции: validate -> prepare -> clone читает конфиг один раз,
+        # а не три.
+        self._config_memo: Dict[tuple, Dict[str, Any]] = {}
+        self._config_memo_lock = threading.RLock()
+        self._config_memo_maxsize = 512
+        # Фоновое обновление несвежих записей (stale-while-revalidate):
+        # протухший, но еще живой кэш отдается сразу, пока пара потоков
+        # перечитывает данные из API.
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2)
+        self._refreshing: set = set()
+        self._refreshing_lock = threading.Lock()
+        # Вторичный индекс ключей кэша: очистка по узлу идет по O(k)
+        # записям этого узла, а не сканом всего кэша.
+        self._keys_by_node: Dict[str, set] = defaultdict(set)
+        self._all_template_keys: set = set()
+
+    def _index_cache_key(self, key: str, node: Optional[str] = None) -> None:
+        """Учесть ключ кэша во вторичном индексе."""
+        self._all_template_keys.add(key)
+        if node is not None:
+            self._keys_by_node[node].add(key)
+
+    def _schedule_refresh(self, key: str, refresh_fn) -> None:
+        """Запустить фоновое обновление ключа не более чем в одном потоке."""
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _run() -> None:
+            try:
+                refresh_fn()
+            except Exception as exc:
+                # Несвежее значение остается в кэше и продолжает отдаваться.
+                self.logger.log_warning(f"Фоновое обновление {key} не удалось: {exc}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(_run)
+
+    def _fetch_vm_config(self, node: str, vmid: int) -> Optional[Dict[str, Any]]:
+        """Получить конфигурацию VM с мемоизацией по (node, vmid)."""
+        memo_key = (node, vmid)
+        with self._config_memo_lock:
+            if memo_key in self._config_memo:
+                return self._config_memo[memo_key]
+        try:
+            vm_config = self.proxmox_client.api_call(
+                "nodes", node, "qemu", vmid, "config", "get"
+            )
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось получить конфигурацию шаблона {vmid}: {exc}")
+            return None
+        if vm_config is not None:
+            with self._config_memo_lock:
+                if len(self._config_memo) >= self._config_memo_maxsize:
+                    self._config_memo.pop(next(iter(self._config_memo)))
+                self._config_memo[memo_key] = vm_config
+        return vm_config
+
+    def invalidate(self, node: str, vmid: int) -> None:
+        """Сбросить мемоизированную конфигурацию и кэш одного шаблона."""
+        with self._config_memo_lock:
+            self._config_memo.pop((node, vmid), None)
+        self.cache.delete(f"template_info:{node}:{vmid}")
+        self.cache.delete(f"template_status:{node}:{vmid}")
+
+    def get_templates(self, target_node: Optional[str] = None,
+                      detailed: bool = False) -> List[TemplateInfo]:
+        """Получить список шаблонов кластера (или одного узла).
+
+        По умолчанию список строится из одного запроса cluster/resources;
+        при detailed=True размеры дисков уточняются по конфигурации каждого
+        шаблона (дополнительный батч запросов).
+        """
+        cache_key = f"templates:{target_node or 'all'}"
+        if detailed:
+            cache_key += ":detailed"
+        cached, is_fresh = self.cache.get_with_status(cache_key)
+        if cached is not None:
+            # TemplateInfo неизменяем — объекты хранятся в кэше как есть,
+            # без пересборки из словарей на каждое чтение. Несвежий список
+            # отдается сразу, обновление идет в фоне.
+            if not is_fresh:
+                self._schedule_refresh(
+                    cache_key,
+                    lambda: self._load_templates(target_node, cache_key, detailed),
+                )
+            return list(cached)
+        return self._load_templates(target_node, cache_key, detailed)
+
+    def _load_templates(self, target_node: Optional[str], cache_key: str,
+                        detailed: bool = False) -> List[TemplateInfo]:
+        """Загрузить список шаблонов из API и обновить кэш."""
+        # Один запрос cluster/resources вместо обхода nodes/*/qemu: сразу
+        # известны все VMID с флагом template по всем узлам, вместе с
+        # maxmem/maxcpu/maxdisk — для списка этого достаточно.
+        resources = self.proxmox_client.get_cluster_resources("vm")
+        # Строки фильтруются генератором и сразу уходят в сборку объектов:
+        # единственная материализация — итоговый список templates.
+        template_rows = (
+            row for row in resources
+            if row.get("template") == 1
+            and (target_node is None or row.get("node") == target_node)
+        )
+
+        if detailed:
+            # Батчу конфигов нужен зафиксированный порядок строк — здесь
+            # генератор материализуется один раз.
+            rows = list(template_rows)
+            # Конфиги шаблонов забираются одним батчем поверх пула
+            # соединений, а не последовательными round-trip на каждый VMID.
+            calls = [
+                ("nodes", row["node"], "qemu", row["vmid"], "config", "get")
+                for row in rows
+            ]
+            configs = self.proxmox_client.api_call_many(calls)
+            parsed = (
+                self._parse_template_data(row, vm_config, row["node"])
+                for row, vm_config in zip(rows, configs)
+                if vm_config is not None
+            )
+        else:
+            parsed = map(self._template_from_resource_row, template_rows)
+
+        # На общем хранилище один VMID виден с нескольких узлов — оставляем
+        # первое вхождение, остальные узлы запоминаем в replica_nodes.
+        deduped: Dict[tuple, TemplateInfo] = {}
+        for template in parsed:
+            if template is None:
+                continue
+            signature = (template.vmid, template.name)
+            kept = deduped.get(signature)
+            if kept is None:
+                deduped[signature] = template
+            else:
+                deduped[signature] = replace(
+                    kept, replica_nodes=kept.replica_nodes + (template.node,)
+                )
+        templates = list(deduped.values())
+
+        self.cache.set(cache_key, templates, ttl=CachePolicy.LONG,
+                       stale_ttl=CachePolicy.LONG * 10)
+        self._index_cache_key(cache_key, target_node)
+        return templates
+
+    def _template_from_resource_row(self, row: Dict[str, Any]) -> Optional[TemplateInfo]:
+        """Собрать TemplateInfo из строки cluster/resources (без config)."""
+        vmid = row.get("vmid")
+        if vmid is None:
+            return None
+        return TemplateInfo(
+            vmid=int(vmid),
+            name=row.get("name", ""),
+            node=row.get("node", ""),
+            memory=int(row.get("maxmem", 0)) // (1024 * 1024),
+            cpus=int(row.get("maxcpu", 1)),
+            disk_size=int(row.get("maxdisk", 0)) // (1024 * 1024),
+            status="template",
+        )
+
+    def get_template_info(self, node: str, vmid: int) -> Optional[TemplateInfo]:
+        """Получить информацию об одном шаблоне.
+
+        Конфигурационная часть (память, CPU, диски) кэшируется надолго,
+        статус — отдельным коротким TTL; они объединяются при возврате.
+        """
+        cache_key = f"template_info:{node}:{vmid}"
+        template, is_fresh = self.cache.get_with_status(cache_key)
+        if template is None:
+            template = self._load_template_info(node, vmid, cache_key)
+            if template is None:
+                return None
+        elif not is_fresh:
+            self._schedule_refresh(
+                cache_key, lambda: self._load_template_info(node, vmid, cache_key)
+            )
+        status = self._get_template_status(node, vmid)
+        if status is not None and status != template.status:
+            template = replace(template, status=status)
+        return template
+
+    def _load_template_info(self, node: str, vmid: int,
+                            cache_key: str) -> Optional[TemplateInfo]:
+        """Загрузить конфигурационную часть шаблона из API и обновить кэш."""
+        # Фоновое обновление должно идти мимо мемо, иначе оно вернет
+        # тот же устаревший конфиг.
+        with self._config_memo_lock:
+            self._config_memo.pop((node, vmid), None)
+        vm_config = self._fetch_vm_config(node, vmid)
+        if vm_config is None:
+            return None
+        template = self._parse_template_data(
+            {"vmid": vmid, "name": vm_config.get("name", "")}, vm_config, node
+        )
+        if template is not None:
+            self.cache.set(cache_key, template, ttl=CachePolicy.LONG,
+                           stale_ttl=CachePolicy.LONG * 10)
+            self._index_cache_key(cache_key, node)
+        return template
+
+    def _get_template_status(self, node: str, vmid: int) -> Optional[str]:
+        """Получить текущий статус VM (короткий TTL)."""
+        cache_key = f"template_status:{node}:{vmid}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            current = self.proxmox_client.api_call(
+                "nodes", node, "qemu", vmid, "status", "current", "get"
+            )
+        except Exception as exc:
+            self.logger.log_warning(f"Не удалось получить статус шаблона {vmid}: {exc}")
+            return None
+        status = current.get("status") if current else None
+        if status is not None:
+            self.cache.set(cache_key, status, ttl=CachePolicy.SHORT)
+            self._index_cache_key(cache_key, node)
+        return status
+
+    def validate_template(self, node: str, vmid: int,
+                          force_probe: bool = False) -> TemplateValidation:
+        """Проверить пригодность шаблона для клонирования."""
+        errors: List[str] = []
+        warnings: List[str] = []
+
+        template = self.get_template_info(node, vmid)
+        if template is None:
+            errors.append(f"Шаблон {vmid} на узле {node} не найден")
+            return TemplateValidation(valid=False, errors=errors, warnings=warnings)
+
+        # Сам объект уже несет признак успешного чтения конфигурации —
+        # повторный запрос к API нужен только при force_probe.
+        if force_probe:
+            with self._config_memo_lock:
+                self._config_memo.pop((node, vmid), None)
+            if self._fetch_vm_config(node, vmid) is None:
+                errors.append("Конфигурация шаблона недоступна")
+        elif not template.config_reachable:
+            errors.append("Конфигурация шаблона недоступна")
+
+        if template.memory < 512:
+            warnings.append(f"Малый объем памяти шаблона: {template.memory}MB")
+        if template.cpus < 1:
+            errors.append("У шаблона не задано число процессоров")
+        if not template.name:
+            warnings.append("У шаблона отсутствует имя")
+
+        return TemplateValidation(valid=not errors, errors=errors, warnings=warnings)
+
+    def prepare_template_for_cloning(self, node: str, vmid: int) -> Optional[Dict[str, Any]]:
+        """Подготовить параметры клонирования шаблона."""
+        validation = self.validate_template(node, vmid)
+        if not validation.valid:
+            for error in validation.errors:
+                self.logger.log_error(f"Шаблон {vmid}: {error}")
+            return None
+        template = self.get_template_info(node, vmid)
+        if template is None:
+            return None
+        # Перед клонированием мемо сбрасывается: следующая операция увидит
+        # актуальную конфигурацию шаблона.
+        self.invalidate(node, vmid)
+        return {
+            "vmid": template.vmid,
+            "node": template.node,
+            "name": template.name,
+            "memory": template.memory,
+            "cpus": template.cpus,
+        }
+
+    def find_templates_by_name(self, name_pattern: str,
+                               target_node: Optional[str] = None) -> List[TemplateInfo]:
+        """Найти шаблоны, имя которых соответствует регулярному выражению."""
+        pattern = _compile_ci(name_pattern)
+        templates = self.get_templates(target_node)
+        return [t for t in templates if pattern.search(t.name)]
+
+    def find_optimal_template(self, requirements: Dict[str, Any],
+                              target_node: Optional[str] = None) -> Optional[TemplateInfo]:
+        """Подобрать шаблон, лучше всего подходящий под требования."""
+        templates = self.get_templates(target_node)
+        # Требования постоянны по всем итерациям — читаем их один раз,
+        # а выбор минимума отдаем C-реализации min().
+        min_mem = requirements.get("min_memory")
+        min_cpus = requirements.get("min_cpus")
+        max_disk = requirements.get("max_disk")
+        want_mem = requirements.get("memory")
+        want_cpus = requirements.get("cpus")
+
+        def score(t: TemplateInfo) -> int:
+            return ((abs(t.memory - want_mem) if want_mem is not None else 0)
+                    + (abs(t.cpus - want_cpus) * 100 if want_cpus is not None else 0))
+
+        suitable = (
+            t for t in templates
+            if (min_mem is None or t.memory >= min_mem)
+            and (min_cpus is None or t.cpus >= min_cpus)
+            and (max_disk is None or t.disk_size <= max_disk)
+        )
+        return min(suitable, key=score, default=None)
+
+    def get_template_statistics(self, target_node: Optional[str] = None) -> Dict[str, Any]:
+        """Получить сводную статистику по шаблонам."""
+        templates = self.get_templates(target_node)
+        # Свертки на C-уровне (sum/map/Counter) вместо интерпретируемого
+        # цикла с ветвлениями на каждый шаблон.
+        # Ключ корзины — целое (memory >> 9 == // 512): хэширование int
+        # на порядок дешевле строкового, строки собираются один раз ниже.
+        memory_buckets = Counter(t.memory >> 9 for t in templates)
+        return {
+            "total": len(templates),
+            "total_memory": sum(map(attrgetter("memory"), templates)),
+            "total_cpus": sum(map(attrgetter("cpus"), templates)),
+            "total_disk": sum(map(attrgetter("disk_size"), templates)),
+            "nodes": dict(Counter(map(attrgetter("node"), templates))),
+            "cpu_distribution": dict(Counter(f"{t.cpus} CPU" for t in templates)),
+            "memory_distribution": {
+                f"{bucket * 512}-{(bucket + 1) * 512}MB": count
+                for bucket, count in memory_buckets.items()
+            },
+        }
+
+    def _parse_template_data(self, vm_data: Dict[str, Any],
+                             vm_config: Dict[str, Any],
+                             node: str) -> Optional[TemplateInfo]:
+        """Собрать TemplateInfo из строки ресурсов и конфигурации VM.
+
+        Функция чистая и без обработчика исключений: конфигурации уже
+        получены, а ошибки программирования не должны глотаться по одной
+        на каждый шаблон.
+        """
+        vmid = vm_data.get("vmid")
+        if vmid is None:
+            return None
+        disk_size = self._calculate_disk_size(vm_config)
+        return TemplateInfo(
+            vmid=int(vmid),
+            name=vm_config.get("name", vm_data.get("name", "")),
+            node=node,
+            memory=int(vm_config.get("memory", 0)),
+            cpus=int(vm_config.get("cores", 1)) * int(vm_config.get("sockets", 1)),
+            disk_size=disk_size,
+            status="template",
+            description=vm_config.get("description", ""),
+            config_reachable=True,
+        )
+
+    def _calculate_disk_size(self, vm_config: Dict[str, Any]) -> int:
+        """Посчитать суммарный размер дисков из конфигурации (в МБ)."""
+        total_size = 0
+        disk_key_match = _DISK_KEY_RE.match
+        size_search = _DISK_SIZE_RE.search
+        for key, value in vm_config.items():
+            if disk_key_match(key) and isinstance(value, str):
+                size_match = size_search(value)
+                if size_match:
+                    total_size += self._parse_disk_size(size_match.group(1))
+        return total_size
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _parse_disk_size(size_str: str) -> int:
+        """Перевести строку размера диска ('32G', '512M') в МБ.
+
+        Размеры приходят из небольшого набора строк — мемоизация сводит
+        повторный разбор к поиску в словаре.
+        """
+        mult = _SIZE_MULT.get(size_str[-1:], None)
+        try:
+            if mult is not None:
+                return int(float(size_str[:-1]) * mult)
+            return int(float(size_str))
+        except ValueError:
+            return 0
+
+    def _template_info_to_dict(self, template: TemplateInfo) -> Dict[str, Any]:
+        """Сериализовать TemplateInfo в словарь (для экспорта в JSON)."""
+        return {
+            "vmid": template.vmid,
+            "name": template.name,
+            "node": template.node,
+            "memory": template.memory,
+            "cpus": template.cpus,
+            "disk_size": template.disk_size,
+            "status": template.status,
+            "description": template.description,
+        }
+
+    def _dict_to_template_info(self, data: Dict[str, Any]) -> TemplateInfo:
+        """Восстановить TemplateInfo из словаря (для импорта из JSON)."""
+        return TemplateInfo(
+            vmid=data["vmid"],
+            name=data["name"],
+            node=data["node"],
+            memory=data["memory"],
+            cpus=data["cpus"],
+            disk_size=data["disk_size"],
+            status=data["status"],
+            description=data.get("description", ""),
+        )
+
+    def clear_template_cache(self, target_node: Optional[str] = None) -> None:
+        """Сбросить кэш шаблонов (всего кластера или одного узла)."""
+        if target_node is None:
+            keys_to_delete = list(self._all_template_keys)
+            self._all_template_keys.clear()
+            self._keys_by_node.clear()
+        else:
+            keys_to_delete = list(self._keys_by_node.pop(target_node, ()))
+            self._all_template_keys.difference_update(keys_to_delete)
+        for key in keys_to_delete:
+            self.cache.delete(key)
+        with self._config_memo_lock:
+            if target_node is None:
+                self._config_memo.clear()
+            else:
+                for memo_key in [k for k in self._config_memo if k[0] == target_node]:
+                    del self._config_memo[memo_key]
+
+
+@functools.lru_cache(maxsize=None)
+def get_template_manager(proxmox_client: ProxmoxClient) -> TemplateManager:
+    """Получить менеджер шаблонов для клиента (один на клиент).
+
+    lru_cache делает фабрику потокобезопасной без ручной блокировки и
+    сводит повторный вызов к одному поиску в словаре; при этом разные
+    клиенты получают разные менеджеры, а не первый созданный.
+    """
+    return TemplateManager(proxmox_client)
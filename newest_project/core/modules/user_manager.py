@@ -0,0 +1,305 @@
+"""Модуль управления пользователями и пулами."""
+
+import fnmatch
+import functools
+import itertools
+import logging
+import re
+import string
+import sys
+from collections import Counter, namedtuple
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+from .logger import Logger, get_logger
+from .validator import Validator
+
+# Конструкция (?=(X+))\1 эмулирует атомарную группу: квантификатор
+# жадно захватывает компонент внутри lookahead, а \1 потребляет его без
+# права на повторные попытки — у шаблона нет бэктрекинга даже на
+# враждебном вводе вида 'aaaa...@'.
+_USER_PATTERN = re.compile(
+    r"^(?=([a-zA-Z0-9._-]+))\1"
+    r"(?:@(?=([a-zA-Z0-9._-]+))\2)?"
+    r"(?:\$(?=([a-zA-Z0-9._-]+))\3)?$"
+)
+
+# Допустимые символы компонентов имени пользователя.
+_ALLOWED = frozenset(string.ascii_letters + string.digits + "._-")
+
+# Результат разбора пользователя: неизменяемый, компактнее словаря,
+# доступ к полям идет по быстрым атрибутам.
+UserParts = namedtuple("UserParts", ("username", "realm", "subuser", "full_user"))
+
+
+# Кэш скомпилированных glob-шаблонов, общий для всех экземпляров
+# UserManager: повторный фильтр тем же шаблоном не перекомпилируется.
+_GLOB_CACHE: Dict[str, Any] = {}
+
+
+def _compile_glob(pattern: str):
+    """Скомпилировать glob-шаблон (с межэкземплярным кэшем).
+
+    fnmatch.translate корректно экранирует метасимволы ('.', '$' и т.п.),
+    которые ручная замена '*'/'?' пропускала.
+    """
+    compiled = _GLOB_CACHE.get(pattern)
+    if compiled is None:
+        if len(_GLOB_CACHE) > 1024:
+            _GLOB_CACHE.clear()
+        compiled = re.compile(fnmatch.translate(pattern))
+        _GLOB_CACHE[pattern] = compiled
+    return compiled
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_user_cached(user_string: str) -> Optional[UserParts]:
+    """Разобрать уже очищенную строку пользователя (с кэшем).
+
+    Одни и те же пользователи разбираются многократно по всему конвейеру
+    (статистика, группировка, форматирование) — повторный вызов сводится
+    к поиску в словаре вместо прогона регулярного выражения. Результат
+    неизменяем, чтобы вызывающие не могли испортить кэш.
+
+    Формат user@realm$subuser тривиален для разделителей — два partition
+    и проверка множества символов обходятся без движка регулярных
+    выражений и возможного бэктрекинга.
+    """
+    user_part, dollar, subuser = user_string.partition("$")
+    username, at, realm = user_part.partition("@")
+    if not username or not _ALLOWED.issuperset(username):
+        return None
+    if at and not (realm and _ALLOWED.issuperset(realm)):
+        return None
+    if dollar and not (subuser and _ALLOWED.issuperset(subuser)):
+        return None
+    # Realm'ов единицы ('pve', 'pam', ...): интернирование дает всем
+    # разборам один объект, а словарям по realm — сравнение по identity.
+    return UserParts(username, sys.intern(realm) if realm else "pve",
+                     sys.intern(subuser) if subuser else None, user_string)
+
+
+class UserManager:
+    """Менеджер пользователей Proxmox и их пулов."""
+
+    # Шаблон компилируется один раз при импорте, а не в каждом __init__.
+    user_pattern = _USER_PATTERN
+
+    def __init__(self, logger: Optional[Logger] = None,
+                 validator: Optional[Validator] = None):
+        self.logger = logger or get_logger()
+        self.validator = validator or Validator(self.logger)
+        # Неудачные разборы кэшируются как None; чтобы не собирать одно
+        # и то же сообщение об ошибке на каждый повтор, каждая битая
+        # строка логируется один раз.
+        self._logged_parse_failures: set = set()
+
+    def parse_user(self, user_string: str) -> Optional[UserParts]:
+        """Разобрать строку вида user@realm$subuser на составляющие."""
+        if not isinstance(user_string, str):
+            return None
+        stripped = user_string.strip()
+        parsed = _parse_user_cached(stripped)
+        if parsed is None and stripped not in self._logged_parse_failures:
+            if len(self._logged_parse_failures) > 1024:
+                self._logged_parse_failures.clear()
+            self._logged_parse_failures.add(stripped)
+            self.logger.log_validation_error("parse_user",
+                                             "Некорректный формат пользователя",
+                                             user_string)
+        return parsed
+
+    def validate_user(self, user_string: str) -> bool:
+        """Проверить корректность одного пользователя."""
+        # Без одноэлементного списка и пакетной преамбулы валидатора.
+        return self.validator.validate_single_user(user_string)
+
+    def _extract_pool_from_user(self, user: str) -> str:
+        """Определить имя пула по realm пользователя."""
+        parsed = self.parse_user(user)
+        if parsed is None:
+            return "default"
+        return parsed.realm
+
+    def extract_pool_name(self, user: str) -> str:
+        """Получить имя пула для пользователя."""
+        return self._extract_pool_from_user(user)
+
+    def _index(self, users: List[str]) -> List[Optional[UserParts]]:
+        """Разобрать список пользователей в колонку результатов.
+
+        Методы группировки читают разборы через zip по этой колонке;
+        в связке с кэшем parse_user повторный обход того же списка
+        сводится к поискам в словаре.
+        """
+        parse = self.parse_user
+        return [parse(user) for user in users]
+
+    def bulk_parse(self, users: List[str]) -> List[Optional[UserParts]]:
+        """Разобрать большой список пользователей пакетно.
+
+        Для крупных списков очистка пробелов уходит в C-ядро pyarrow
+        (если установлен), а разбор выполняется по уникальным строкам:
+        на реальных списках с повторами это на порядок меньше вызовов,
+        чем поэлементный проход. До ~1000 элементов накладные расходы
+        не окупаются — работает обычный скалярный путь. Неудачные
+        разборы здесь не логируются.
+        """
+        if len(users) < 1000:
+            return self._index(users)
+        if pa is not None:
+            stripped = pc.utf8_trim_whitespace(
+                pa.array(users, type=pa.string())
+            ).to_pylist()
+        else:
+            stripped = [u.strip() if isinstance(u, str) else None for u in users]
+        parse = _parse_user_cached
+        unique = {s: (parse(s) if s is not None else None) for s in set(stripped)}
+        return [unique[s] for s in stripped]
+
+    def create_user_pool_mapping(self, users: List[str]) -> Dict[str, str]:
+        """Построить отображение пользователь -> пул."""
+        return {
+            user: (parsed.realm if parsed else "default")
+            for user, parsed in zip(users, self._index(users))
+        }
+
+    def get_users_by_pool(self, users: List[str], pool: str) -> List[str]:
+        """Выбрать пользователей, относящихся к пулу."""
+        return [
+            user for user, parsed in zip(users, self._index(users))
+            if (parsed.realm if parsed else "default") == pool
+        ]
+
+    def group_users_by_pool(self, users: List[str]) -> Dict[str, List[str]]:
+        """Сгруппировать пользователей по пулам."""
+        # setdefault на обычном словаре: без финальной пересборки
+        # defaultdict в dict и без фабрики ключей у результата.
+        pools: Dict[str, List[str]] = {}
+        for user, parsed in zip(users, self._index(users)):
+            pools.setdefault(parsed.realm if parsed else "default", []).append(user)
+        return pools
+
+    def split_users_by_realm(self, users: List[str]) -> Dict[str, List[str]]:
+        """Разделить пользователей по realm."""
+        realms: Dict[str, List[str]] = {}
+        for user, parsed in zip(users, self._index(users)):
+            if parsed is not None:
+                realms.setdefault(parsed.realm, []).append(user)
+        return realms
+
+    def merge_user_lists(self, *user_lists: List[str]) -> List[str]:
+        """Объединить несколько списков пользователей без дубликатов."""
+        # Конструктор set потребляет весь сцепленный итератор на C-уровне,
+        # без цикла update по каждому списку.
+        valid = (lst for lst in user_lists if isinstance(lst, list))
+        merged = set(itertools.chain.from_iterable(valid))
+        merged.discard("")
+        return sorted(user for user in merged if user and not user.isspace())
+
+    def find_duplicate_users(self, users: List[str]) -> List[str]:
+        """Найти пользователей, встречающихся в списке более одного раза."""
+        # Counter считает весь список своим C-циклом — одна операция
+        # на элемент вместо проверки и двух мутаций множеств.
+        counts = Counter(user.strip() for user in users if user and user.strip())
+        return [user for user, count in counts.items() if count > 1]
+
+    def filter_users_by_pattern(self, users: List[str], pattern: str) -> List[str]:
+        """Отфильтровать пользователей по glob-шаблону."""
+        if pattern == "*":
+            return list(users)
+        # Матчер берется из модульного кэша; в отличие от fnmatch.filter
+        # сравнение регистрозависимо на любой платформе.
+        matcher = _compile_glob(pattern).match
+        return [user for user in users if matcher(user)]
+
+    def generate_user_variants(self, base_user: str, count: int) -> List[str]:
+        """Сгенерировать нумерованные варианты пользователя."""
+        parsed = self.parse_user(base_user)
+        if parsed is None:
+            return []
+        # Инварианты (realm, суффикс subuser) вычисляются один раз,
+        # сам цикл — плотное списковое включение.
+        base = parsed.username
+        realm = parsed.realm
+        suffix = f"${parsed.subuser}" if parsed.subuser else ""
+        return [f"{base}{i}@{realm}{suffix}" for i in range(1, count + 1)]
+
+    def format_user_for_display(self, user: str) -> str:
+        """Привести пользователя к каноническому виду для вывода."""
+        parsed = self.parse_user(user)
+        if parsed is None:
+            return user
+        # Вход уже в каноническом виде в большинстве случаев — тогда
+        # возвращается исходная строка без новой аллокации.
+        display = f"{parsed.username}@{parsed.realm}"
+        if parsed.subuser:
+            display += f"${parsed.subuser}"
+        if display == parsed.full_user:
+            return parsed.full_user
+        return display
+
+    def cleanup_user_list(self, users: List[str]) -> List[str]:
+        """Очистить список пользователей от пустых и некорректных записей."""
+        stripped = [user.strip() for user in users if user and user.strip()]
+        if not stripped:
+            return []
+        # Одна пакетная валидация вместо N вызовов validate_user с
+        # одноэлементными списками.
+        results = self.validator.validate_users_list_detailed(stripped)
+        cleaned = []
+        invalid = []
+        for user, is_valid in zip(stripped, results):
+            (cleaned if is_valid else invalid).append(user)
+        if invalid:
+            # Одна сводная запись вместо записи на каждого некорректного
+            # пользователя; пообъектные сообщения — только на уровне DEBUG.
+            details = ", ".join(invalid[:20]) + ("..." if len(invalid) > 20 else "")
+            self.logger.log_validation_error(
+                "cleanup_users",
+                f"Удалено некорректных пользователей: {len(invalid)}",
+                details,
+            )
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for user in invalid:
+                    self.logger.log_debug(f"Некорректный пользователь: {user}")
+        return cleaned
+
+    def get_user_statistics(self, users: List[str]) -> Dict[str, Any]:
+        """Получить сводную статистику по пользователям."""
+        # Один проход с одним parse_user на пользователя вместо трех
+        # обходов списка (группировка + realm + подсчет размеров).
+        pools: Counter = Counter()
+        realms: Counter = Counter()
+        for user in users:
+            parsed = self.parse_user(user)
+            if parsed is not None:
+                realm = parsed.realm
+                realms[realm] += 1
+                pools[realm] += 1
+            else:
+                pools["default"] += 1
+        return {
+            "total": len(users),
+            "unique_pools": len(pools),
+            "unique_realms": len(realms),
+            "pools": dict(pools),
+            "realms": dict(realms),
+        }
+
+
+_global_user_manager: Optional[UserManager] = None
+
+
+def get_user_manager() -> UserManager:
+    """Получить глобальный экземпляр менеджера пользователей."""
+    global _global_user_manager
+    if _global_user_manager is None:
+        _global_user_manager = UserManager()
+    return _global_user_manager
@@ -0,0 +1,61 @@
+"""Модуль валидации входных данных."""
+
+import re
+from typing import List, Optional
+
+from .logger import Logger, get_logger
+
+
+class Validator:
+    """Валидатор пользовательского ввода и конфигураций."""
+
+    # Атомарная эмуляция (?=(X+))\1 исключает бэктрекинг на вводе
+    # с завершающим '@'/'$' (см. user_manager._USER_PATTERN).
+    USER_PATTERN = re.compile(
+        r"^(?=([a-zA-Z0-9._-]+))\1"
+        r"(?:@(?=([a-zA-Z0-9._-]+))\2)?"
+        r"(?:\$(?=([a-zA-Z0-9._-]+))\3)?$"
+    )
+    NODE_PATTERN = re.compile(r"^[a-zA-Z0-9.-]+$")
+
+    def __init__(self, logger: Optional[Logger] = None):
+        self.logger = logger or get_logger()
+
+    def validate_users_list(self, users: List[str]) -> bool:
+        """Проверить список пользователей целиком."""
+        if not isinstance(users, list) or not users:
+            self.log_validation_error("users_list", "Список пользователей пуст или не является списком")
+            return False
+        for user in users:
+            if not isinstance(user, str) or not self.USER_PATTERN.match(user.strip()):
+                self.log_validation_error("users_list", "Некорректный пользователь", str(user))
+                return False
+        return True
+
+    def validate_single_user(self, user: str) -> bool:
+        """Проверить одного пользователя без пакетной обертки."""
+        return isinstance(user, str) and bool(self.USER_PATTERN.match(user.strip()))
+
+    def validate_users_list_detailed(self, users: List[str]) -> List[bool]:
+        """Проверить список пользователей поэлементно.
+
+        В отличие от validate_users_list возвращает результат по каждому
+        элементу — одна пакетная проверка вместо N вызовов с
+        одноэлементными списками.
+        """
+        if not isinstance(users, list):
+            return []
+        match = self.USER_PATTERN.match
+        return [isinstance(user, str) and bool(match(user.strip())) for user in users]
+
+    def validate_node_name(self, node: str) -> bool:
+        """Проверить имя узла кластера."""
+        return isinstance(node, str) and bool(self.NODE_PATTERN.match(node))
+
+    def validate_vmid(self, vmid: int) -> bool:
+        """Проверить идентификатор виртуальной машины."""
+        return isinstance(vmid, int) and 100 <= vmid <= 999999999
+
+    def log_validation_error(self, context: str, message: str, details: str = "") -> None:
+        """Записать ошибку валидации через логгер."""
+        self.logger.log_validation_error(context, message, details)
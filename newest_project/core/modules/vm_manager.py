@@ -0,0 +1,708 @@
+"""Модуль управления виртуальными машинами.
+
+Создание, запуск, остановка и удаление VM поверх клиента Proxmox,
+с кэшированием информации о машинах и массовыми операциями.
+"""
+
+import asyncio
+import functools
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .cache import Cache
+from .logger import Logger, get_logger
+from .proxmox_client import ProxmoxClient
+from .validator import Validator
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_pattern(pattern: str) -> "re.Pattern":
+    """Скомпилировать регулярное выражение имени VM (с кэшем)."""
+    return re.compile(pattern)
+
+
+# Маркер отрицательного результата: VM не существует, повторные запросы
+# не нужны до истечения короткого TTL.
+_SENTINEL_NOT_FOUND = "__vm_not_found__"
+
+# Сборщики ключей кэша, связанные один раз: без прогона f-строки на
+# каждом обращении горячего пути.
+_vm_status_key = "vm_status:{}:{}".format
+_vm_config_key = "vm_config:{}:{}".format
+_vm_info_key = "vm_info:{}:{}".format
+
+
+def _is_not_found(exc: Exception) -> bool:
+    """Определить, означает ли исключение отсутствие VM (HTTP 404)."""
+    if getattr(exc, "status_code", None) == 404:
+        return True
+    return "404" in str(exc)
+
+
+@dataclass
+class VMConfig:
+    """Конфигурация создаваемой виртуальной машины."""
+
+    name: str
+    memory: int
+    cpus: int
+    template_vmid: int
+    template_node: str
+    target_node: str
+    networks: List[Dict[str, Any]] = field(default_factory=list)
+    description: str = ""
+
+
+@dataclass
+class VMOperationResult:
+    """Результат операции над виртуальной машиной."""
+
+    success: bool
+    vmid: Optional[int] = None
+    message: str = ""
+    error: str = ""
+
+
+class VMManager:
+    """Менеджер виртуальных машин Proxmox."""
+
+    # TTL по типу данных: конфигурация (память, ядра) меняется только при
+    # редеплое и живет долго, статус (cpu_usage, uptime) устаревает за
+    # секунды. Пары (минимум, максимум) задают коридор для адаптивного TTL.
+    TTL_STATUS = (5.0, 30.0)
+    TTL_CONFIG = (300.0, 900.0)
+
+    # Схема проверки конфигурации VM: (атрибут, предикат, сообщение).
+    # Таблица строится один раз на класс, проверка — один проход по ней.
+    _VM_CONFIG_SCHEMA = (
+        ("name", bool, "Имя VM не может быть пустым"),
+        ("memory", lambda value: value > 0,
+         "Размер памяти должен быть положительным"),
+        ("cpus", lambda value: value > 0,
+         "Число CPU должно быть положительным"),
+        ("template_vmid", lambda value: value > 0,
+         "VMID шаблона должен быть положительным"),
+        ("template_node", bool, "Не указан узел шаблона"),
+        ("target_node", bool, "Не указан целевой узел"),
+    )
+
+    def __init__(self, proxmox_client: ProxmoxClient, cache: Optional[Cache] = None,
+                 logger: Optional[Logger] = None, validator: Optional[Validator] = None,
+                 max_connections: Optional[int] = None):
+        self.proxmox = proxmox_client
+        self.cache = cache or proxmox_client.cache
+        self.logger = logger or get_logger()
+        self.validator = validator or Validator(self.logger)
+        # Размер пачки и пауза между пачками для массовых операций:
+        # Proxmox ограничивает число одновременных задач на узле, полная
+        # параллельность по всему списку роняет его очередь в 5xx.
+        self.bulk_concurrency = 20
+        self.bulk_batch_delay = 1.0
+        # Пул HTTP-соединений клиента расширяется под массовые операции:
+        # параллельные вызовы не выбивают соединения из тесного пула и не
+        # платят за повторные TLS-рукопожатия.
+        if max_connections is None:
+            max_connections = max(self.bulk_concurrency * 2, 20)
+        self.max_connections = max_connections
+        proxmox_client.configure_pool(max_connections)
+        # Пул для асинхронных оберток: блокирующие вызовы proxmoxer
+        # раскладываются по потокам, потоки живут вместе с менеджером.
+        self._executor = ThreadPoolExecutor(max_workers=16)
+        # Индекс ключей кэша по узлу: инвалидация узла обходит только его
+        # ключи вместо сканирования всего кэша по префиксу.
+        self._vm_keys_by_node: Dict[str, set] = defaultdict(set)
+        # Single-flight для конкурентных запросов одной VM: при промахе
+        # кэша первый вызов делает запрос, остальные ждут его Future.
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        # Ключи, по которым уже идет фоновое обновление несвежих записей.
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        # Интернированные имена узлов: набор имен мал и долгоживущ, после
+        # интернирования поиски по словарям сравнивают их по identity.
+        self._node_intern: Dict[str, str] = {}
+
+    def list_vms(self, target_node: Optional[str] = None,
+                 include_templates: bool = False,
+                 detail: bool = False,
+                 name_regex: Optional["re.Pattern"] = None) -> List[Dict[str, Any]]:
+        """Получить список виртуальных машин кластера или узла."""
+        return asyncio.run(
+            self.list_vms_async(target_node, include_templates, detail, name_regex)
+        )
+
+    async def list_vms_async(self, target_node: Optional[str] = None,
+                             include_templates: bool = False,
+                             detail: bool = False,
+                             name_regex: Optional["re.Pattern"] = None) -> List[Dict[str, Any]]:
+        """Асинхронно получить список виртуальных машин.
+
+        Списки VM по узлам запрашиваются через asyncio.gather поверх пула
+        потоков. Ответ nodes/{node}/qemu уже содержит имя, статус, память
+        и CPU каждой машины, поэтому по умолчанию список собирается из
+        него без единого дополнительного запроса. detail=True добирает
+        поля конфигурации через get_vm_info по каждой VM. name_regex
+        отсекает машины по имени еще на сырых строках — не совпавшие VM
+        не получают детальных запросов вовсе.
+        """
+        nodes = [target_node] if target_node else self.proxmox.get_nodes()
+        if not nodes:
+            return []
+        loop = asyncio.get_running_loop()
+        listings = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._fetch_node_vms, node)
+            for node in nodes
+        ))
+        # Ветка по include_templates выбирается один раз до цикла, а не
+        # пересчитывается на каждой строке.
+        if include_templates:
+            pairs = [
+                (node, vm_data)
+                for node, node_vms in zip(nodes, listings)
+                for vm_data in node_vms
+            ]
+        else:
+            pairs = [
+                (node, vm_data)
+                for node, node_vms in zip(nodes, listings)
+                for vm_data in node_vms
+                if vm_data.get("template") != 1
+            ]
+        if name_regex is not None:
+            search = name_regex.search
+            pairs = [(node, vm_data) for node, vm_data in pairs
+                     if search(vm_data.get("name", ""))]
+        if not pairs:
+            return []
+        if not detail:
+            return [self._vm_info_from_row(node, vm_data)
+                    for node, vm_data in pairs]
+        # Прогрев из кэша одним multi_get: попадания собираются без
+        # единого обращения к API, асинхронные запросы уходят только по
+        # промахам.
+        keyed = [
+            (node, vm_data,
+             _vm_status_key(self._intern(node), vm_data["vmid"]),
+             _vm_config_key(self._intern(node), vm_data["vmid"]))
+            for node, vm_data in pairs
+        ]
+        cached = self.cache.multi_get(
+            [key for _, _, skey, ckey in keyed for key in (skey, ckey)]
+        )
+        infos = []
+        misses = []
+        for node, vm_data, skey, ckey in keyed:
+            status = cached.get(skey)
+            config = cached.get(ckey)
+            if status == _SENTINEL_NOT_FOUND:
+                continue
+            if status is not None and config is not None:
+                infos.append(self._merge_vm_info(node, vm_data["vmid"],
+                                                 status, config))
+            else:
+                misses.append((node, vm_data))
+        if misses:
+            fetched = await asyncio.gather(*(
+                self._get_vm_info_async(node, vm_data["vmid"])
+                for node, vm_data in misses
+            ))
+            infos.extend(info for info in fetched if info is not None)
+        return infos
+
+    async def iter_vms(self, target_node: Optional[str] = None,
+                       include_templates: bool = False,
+                       name_regex: Optional["re.Pattern"] = None):
+        """Асинхронно итерировать виртуальные машины по мере готовности.
+
+        В отличие от list_vms_async результат не материализуется: каждая
+        vm_info отдается сразу, как только пришел ее ответ (as_completed),
+        поэтому поиск первого совпадения стоит один round-trip, а пик
+        памяти — одна запись вместо всего списка.
+        """
+        nodes = [target_node] if target_node else self.proxmox.get_nodes()
+        if not nodes:
+            return
+        loop = asyncio.get_running_loop()
+        listings = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._fetch_node_vms, node)
+            for node in nodes
+        ))
+        pairs = [
+            (node, vm_data)
+            for node, node_vms in zip(nodes, listings)
+            for vm_data in node_vms
+            if include_templates or vm_data.get("template") != 1
+        ]
+        if name_regex is not None:
+            search = name_regex.search
+            pairs = [(node, vm_data) for node, vm_data in pairs
+                     if search(vm_data.get("name", ""))]
+        tasks = [
+            asyncio.ensure_future(self._get_vm_info_async(node, vm_data["vmid"]))
+            for node, vm_data in pairs
+        ]
+        for fut in asyncio.as_completed(tasks):
+            info = await fut
+            if info is not None:
+                yield info
+
+    async def iter_vms_by_name(self, name_pattern: str,
+                               target_node: Optional[str] = None):
+        """Асинхронно итерировать VM, совпавшие по имени."""
+        async for vm_info in self.iter_vms(
+                target_node, name_regex=_compile_pattern(name_pattern)):
+            yield vm_info
+
+    @staticmethod
+    def _vm_info_from_row(node: str, vm_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Собрать vm_info из строки пакетного списка nodes/{node}/qemu."""
+        return {
+            "vmid": vm_data.get("vmid"),
+            "name": vm_data.get("name", ""),
+            "node": node,
+            "status": vm_data.get("status", "unknown"),
+            "memory": vm_data.get("maxmem", 0) // 1024 // 1024,
+            "cpus": vm_data.get("cpus", 1),
+            "uptime": vm_data.get("uptime", 0),
+            "cpu_usage": vm_data.get("cpu", 0.0),
+            "memory_usage": vm_data.get("mem", 0),
+        }
+
+    def _fetch_node_vms(self, node: str) -> List[Dict[str, Any]]:
+        """Получить сырой список VM одного узла."""
+        try:
+            return self.proxmox.api_call("nodes", node, "qemu", "get")
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось получить список VM узла {node}: {exc}")
+            return []
+
+    async def _get_vm_info_async(self, node: str, vmid: int) -> Optional[Dict[str, Any]]:
+        """Асинхронная обертка над get_vm_info с дедупликацией запросов.
+
+        Всплеск конкурентных вызовов по одной VM (list_vms + массовые
+        операции) превращается в один запрос к API: победитель кладет
+        результат в Future, остальные его ждут.
+        """
+        key = _vm_info_key(self._intern(node), vmid)
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await fut
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        try:
+            info = await loop.run_in_executor(self._executor, self.get_vm_info,
+                                              node, vmid)
+        except Exception as exc:
+            fut.set_exception(exc)
+            raise
+        else:
+            fut.set_result(info)
+            return info
+        finally:
+            del self._inflight[key]
+
+    @staticmethod
+    def _adaptive_ttl(fetch_time: float, policy: tuple) -> float:
+        """Подобрать TTL по стоимости запроса в пределах коридора политики.
+
+        Чем дороже достался ответ, тем дольше он живет: медленный узел не
+        опрашивается на каждой итерации мониторинга.
+        """
+        floor, ceiling = policy
+        return min(max(floor, fetch_time * 10 + floor), ceiling)
+
+    def _intern(self, node: str) -> str:
+        """Вернуть интернированную копию имени узла."""
+        return self._node_intern.setdefault(node, sys.intern(node))
+
+    def _schedule_refresh(self, cache_key: str, refresh_fn) -> None:
+        """Обновить несвежую запись кэша в фоне (не более одного раза на ключ)."""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def run() -> None:
+            try:
+                refresh_fn()
+            except Exception as exc:
+                self.logger.log_warning(
+                    f"Фоновое обновление {cache_key} не удалось: {exc}"
+                )
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        self._executor.submit(run)
+
+    def _get_vm_status(self, node: str, vmid: int,
+                       allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+        """Получить текущий статус VM (короткий TTL).
+
+        Несвежая, но не истекшая запись возвращается сразу, а обновление
+        уходит в фон: цикл мониторинга не ждет round-trip, а при
+        недоступности API работает на последнем известном состоянии.
+        """
+        cache_key = _vm_status_key(self._intern(node), vmid)
+        cached, fresh = self.cache.get_with_status(cache_key)
+        if cached is not None:
+            if not fresh:
+                if not allow_stale:
+                    return self._fetch_vm_status(node, vmid, cache_key)
+                self._schedule_refresh(
+                    cache_key,
+                    lambda: self._fetch_vm_status(node, vmid, cache_key),
+                )
+            return cached
+        return self._fetch_vm_status(node, vmid, cache_key)
+
+    def _fetch_vm_status(self, node: str, vmid: int,
+                         cache_key: str) -> Dict[str, Any]:
+        """Запросить статус VM у API и наполнить кэш."""
+        started = time.perf_counter()
+        status = self.proxmox.api_call("nodes", node, "qemu", vmid,
+                                       "status", "current", "get")
+        ttl = self._adaptive_ttl(time.perf_counter() - started, self.TTL_STATUS)
+        self.cache.set(cache_key, status, ttl=ttl, stale_ttl=ttl * 10)
+        self._vm_keys_by_node[node].add(cache_key)
+        return status
+
+    def _get_vm_config(self, node: str, vmid: int,
+                       allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+        """Получить конфигурацию VM (длинный TTL)."""
+        cache_key = _vm_config_key(self._intern(node), vmid)
+        cached, fresh = self.cache.get_with_status(cache_key)
+        if cached is not None:
+            if not fresh:
+                if not allow_stale:
+                    return self._fetch_vm_config(node, vmid, cache_key)
+                self._schedule_refresh(
+                    cache_key,
+                    lambda: self._fetch_vm_config(node, vmid, cache_key),
+                )
+            return cached
+        return self._fetch_vm_config(node, vmid, cache_key)
+
+    def _fetch_vm_config(self, node: str, vmid: int,
+                         cache_key: str) -> Dict[str, Any]:
+        """Запросить конфигурацию VM у API и наполнить кэш."""
+        started = time.perf_counter()
+        config = self.proxmox.api_call("nodes", node, "qemu", vmid,
+                                       "config", "get")
+        ttl = self._adaptive_ttl(time.perf_counter() - started, self.TTL_CONFIG)
+        self.cache.set(cache_key, config, ttl=ttl, stale_ttl=ttl * 10)
+        self._vm_keys_by_node[node].add(cache_key)
+        return config
+
+    def get_vm_info(self, node: str, vmid: int,
+                    allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+        """Получить информацию о виртуальной машине (кэшируется).
+
+        Статус и конфигурация кэшируются раздельно: в цикле мониторинга
+        перезапрашивается только короткоживущий статус, а конфигурация
+        переиспользуется из кэша. При allow_stale несвежие записи
+        отдаются сразу и обновляются в фоне (stale-while-revalidate);
+        allow_stale=False требует синхронного обновления.
+        """
+        try:
+            status = self._get_vm_status(node, vmid, allow_stale)
+            if status == _SENTINEL_NOT_FOUND:
+                return None
+            config = self._get_vm_config(node, vmid, allow_stale)
+        except Exception as exc:
+            if _is_not_found(exc):
+                # Отрицательный результат тоже кэшируется: циклы опроса
+                # только что удаленной VM не бьют по API двумя запросами
+                # на каждую итерацию.
+                cache_key = _vm_status_key(self._intern(node), vmid)
+                self.cache.set(cache_key, _SENTINEL_NOT_FOUND, ttl=30)
+                self._vm_keys_by_node[node].add(cache_key)
+            self.logger.log_error(
+                f"Не удалось получить информацию о VM {vmid} на {node}: {exc}"
+            )
+            return None
+        return self._merge_vm_info(node, vmid, status, config)
+
+    @staticmethod
+    def _merge_vm_info(node: str, vmid: int, status: Dict[str, Any],
+                       config: Dict[str, Any]) -> Dict[str, Any]:
+        """Собрать vm_info из статуса и конфигурации."""
+        return {
+            "vmid": vmid,
+            "name": status.get("name", config.get("name", "")),
+            "node": node,
+            "status": status.get("status", "unknown"),
+            "memory": config.get("memory", 0),
+            "cpus": config.get("cores", 1),
+            "uptime": status.get("uptime", 0),
+            "cpu_usage": status.get("cpu", 0.0),
+            "memory_usage": status.get("mem", 0),
+        }
+
+    def create_vm(self, vm_config: VMConfig) -> VMOperationResult:
+        """Создать виртуальную машину клонированием шаблона."""
+        if not self._validate_vm_config(vm_config):
+            return VMOperationResult(success=False,
+                                     error="Некорректная конфигурация VM")
+        try:
+            new_vmid = self.proxmox.get_next_vmid()
+            params: Dict[str, Any] = {
+                "newid": new_vmid,
+                "name": vm_config.name,
+                "full": 1,
+            }
+            if vm_config.target_node != vm_config.template_node:
+                params["target"] = vm_config.target_node
+            self.proxmox.api_call(
+                "nodes", vm_config.template_node, "qemu",
+                vm_config.template_vmid, "clone", "post", **params
+            )
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось создать VM {vm_config.name}: {exc}")
+            return VMOperationResult(success=False, error=str(exc))
+        self.logger.log_vm_operation("create", new_vmid, vm_config.target_node,
+                                     "created")
+        return VMOperationResult(success=True, vmid=new_vmid,
+                                 message=f"VM {vm_config.name} создана")
+
+    def start_vm(self, node: str, vmid: int) -> VMOperationResult:
+        """Запустить виртуальную машину."""
+        vm_info = self.get_vm_info(node, vmid)
+        if vm_info is None:
+            return VMOperationResult(success=False, vmid=vmid,
+                                     error=f"VM {vmid} не найдена на {node}")
+        if vm_info.get("status") == "running":
+            return VMOperationResult(success=True, vmid=vmid,
+                                     message=f"VM {vmid} уже запущена")
+        try:
+            self.proxmox.api_call("nodes", node, "qemu", vmid,
+                                  "status", "start", "post")
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось запустить VM {vmid}: {exc}")
+            return VMOperationResult(success=False, vmid=vmid, error=str(exc))
+        self._clear_vm_cache(node, vmid)
+        self.logger.log_vm_operation("start", vmid, node, "started")
+        return VMOperationResult(success=True, vmid=vmid,
+                                 message=f"VM {vmid} запущена")
+
+    def stop_vm(self, node: str, vmid: int) -> VMOperationResult:
+        """Остановить виртуальную машину."""
+        vm_info = self.get_vm_info(node, vmid)
+        if vm_info is None:
+            return VMOperationResult(success=False, vmid=vmid,
+                                     error=f"VM {vmid} не найдена на {node}")
+        if vm_info.get("status") == "stopped":
+            return VMOperationResult(success=True, vmid=vmid,
+                                     message=f"VM {vmid} уже остановлена")
+        try:
+            self.proxmox.api_call("nodes", node, "qemu", vmid,
+                                  "status", "stop", "post")
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось остановить VM {vmid}: {exc}")
+            return VMOperationResult(success=False, vmid=vmid, error=str(exc))
+        self._clear_vm_cache(node, vmid)
+        self.logger.log_vm_operation("stop", vmid, node, "stopped")
+        return VMOperationResult(success=True, vmid=vmid,
+                                 message=f"VM {vmid} остановлена")
+
+    def delete_vm(self, node: str, vmid: int) -> VMOperationResult:
+        """Удалить виртуальную машину."""
+        vm_info = self.get_vm_info(node, vmid)
+        if vm_info is None:
+            return VMOperationResult(success=False, vmid=vmid,
+                                     error=f"VM {vmid} не найдена на {node}")
+        if vm_info.get("status") == "running":
+            return VMOperationResult(success=False, vmid=vmid,
+                                     error=f"VM {vmid} запущена, сначала остановите ее")
+        try:
+            self.proxmox.api_call("nodes", node, "qemu", vmid, "delete")
+        except Exception as exc:
+            self.logger.log_error(f"Не удалось удалить VM {vmid}: {exc}")
+            return VMOperationResult(success=False, vmid=vmid, error=str(exc))
+        self._clear_vm_cache(node, vmid)
+        self.logger.log_vm_operation("delete", vmid, node, "deleted")
+        return VMOperationResult(success=True, vmid=vmid,
+                                 message=f"VM {vmid} удалена")
+
+    async def _run_op(self, op, node: str, vmid: int) -> VMOperationResult:
+        """Выполнить синхронную операцию над VM в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, op, node, vmid)
+
+    async def _bulk_execute(self, vm_list: List[Dict[str, Any]], op,
+                            batch_size: Optional[int] = None,
+                            batch_delay: Optional[float] = None) -> Dict[str, VMOperationResult]:
+        """Выполнить операцию над списком VM пачками.
+
+        Внутри пачки вызовы идут параллельно через asyncio.gather, между
+        пачками выдерживается пауза — ускорение почти линейно по размеру
+        пачки, но очередь задач Proxmox не переполняется. Исключение по
+        одной VM не обрывает остальные: оно превращается в неуспешный
+        VMOperationResult в общем словаре результатов.
+        """
+        if batch_size is None:
+            batch_size = self.bulk_concurrency
+        if batch_delay is None:
+            batch_delay = self.bulk_batch_delay
+        results: Dict[str, VMOperationResult] = {}
+        for start in range(0, len(vm_list), batch_size):
+            chunk = vm_list[start:start + batch_size]
+            chunk_results = await asyncio.gather(
+                *(self._run_op(op, vm["node"], vm["vmid"]) for vm in chunk),
+                return_exceptions=True,
+            )
+            results.update({
+                f"{vm['node']}:{vm['vmid']}": (
+                    result if not isinstance(result, BaseException)
+                    else VMOperationResult(success=False, vmid=vm["vmid"],
+                                           error=str(result))
+                )
+                for vm, result in zip(chunk, chunk_results)
+            })
+            if start + batch_size < len(vm_list):
+                await asyncio.sleep(batch_delay)
+        return results
+
+    def bulk_start_vms(self, vm_list: List[Dict[str, Any]]) -> Dict[str, VMOperationResult]:
+        """Запустить группу виртуальных машин."""
+        return asyncio.run(self._bulk_execute(vm_list, self.start_vm))
+
+    def bulk_stop_vms(self, vm_list: List[Dict[str, Any]]) -> Dict[str, VMOperationResult]:
+        """Остановить группу виртуальных машин."""
+        return asyncio.run(self._bulk_execute(vm_list, self.stop_vm))
+
+    def bulk_delete_vms(self, vm_list: List[Dict[str, Any]]) -> Dict[str, VMOperationResult]:
+        """Удалить группу виртуальных машин."""
+        return asyncio.run(self._bulk_execute(vm_list, self.delete_vm))
+
+    def _iter_raw_vm_data(self, target_node: Optional[str] = None):
+        """Итерировать сырые строки nodes/{node}/qemu парами (узел, строка).
+
+        Генератор не материализует промежуточных структур — потребители,
+        которым не нужны словари vm_info, агрегируют прямо по ответу API.
+        """
+        nodes = [target_node] if target_node else self.proxmox.get_nodes()
+        for node in nodes:
+            yield from ((node, vm_data)
+                        for vm_data in self._fetch_node_vms(node))
+
+    def get_vm_statistics(self, target_node: Optional[str] = None) -> Dict[str, Any]:
+        """Получить сводную статистику по виртуальным машинам.
+
+        Один проход по сырым строкам пакетного ответа: ни списка vm_info,
+        ни словаря на машину не создается.
+        """
+        statuses: Counter = Counter()
+        node_totals: Counter = Counter()
+        node_running: Counter = Counter()
+        total_memory = 0
+        total_cpus = 0
+        total = 0
+        for node, vm_data in self._iter_raw_vm_data(target_node):
+            if vm_data.get("template") == 1:
+                continue
+            total += 1
+            status = vm_data.get("status", "unknown")
+            statuses[status] += 1
+            node_totals[node] += 1
+            if status == "running":
+                node_running[node] += 1
+            total_memory += vm_data.get("maxmem", 0) >> 20
+            total_cpus += vm_data.get("cpus", 1)
+        running = statuses["running"]
+        return {
+            "total_vms": total,
+            "running_vms": running,
+            "stopped_vms": total - running,
+            "total_memory": total_memory,
+            "total_cpus": total_cpus,
+            "nodes": {
+                node: {"total": node_total, "running": node_running[node]}
+                for node, node_total in node_totals.items()
+            },
+        }
+
+    def find_vms_by_name(self, name_pattern: str,
+                         target_node: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Найти виртуальные машины по регулярному выражению имени.
+
+        Фильтр по имени выполняется внутри list_vms на сырых строках
+        пакетного ответа — детальной работы над несовпавшими VM нет.
+        """
+        return self.list_vms(target_node, name_regex=_compile_pattern(name_pattern))
+
+    def _validate_vm_config(self, vm_config: VMConfig) -> bool:
+        """Проверить конфигурацию VM перед созданием (по схеме)."""
+        errors = [
+            message
+            for attr, predicate, message in self._VM_CONFIG_SCHEMA
+            if not predicate(getattr(vm_config, attr))
+        ]
+        for error in errors:
+            self.validator.log_validation_error("vm_config", error, vm_config.name)
+        return not errors
+
+    def _clear_vm_cache(self, node: str, vmid: int) -> None:
+        """Сбросить кэш одной виртуальной машины."""
+        node = self._intern(node)
+        node_keys = self._vm_keys_by_node.get(node)
+        for key in (_vm_status_key(node, vmid), _vm_config_key(node, vmid)):
+            self.cache.delete(key)
+            if node_keys is not None:
+                node_keys.discard(key)
+
+    def clear_vm_cache(self, target_node: Optional[str] = None) -> int:
+        """Сбросить кэш информации о виртуальных машинах.
+
+        Делегирует delete_prefix кэша — без заглядывания в его внутренний
+        словарь, так что смена бэкенда кэша менеджера не касается.
+        Возвращает число удаленных записей.
+        """
+        if target_node:
+            removed = self.cache.delete_prefix(f"vm_status:{target_node}:")
+            removed += self.cache.delete_prefix(f"vm_config:{target_node}:")
+            self._vm_keys_by_node.pop(target_node, None)
+        else:
+            removed = self.cache.delete_prefix("vm_status:")
+            removed += self.cache.delete_prefix("vm_config:")
+            self._vm_keys_by_node.clear()
+        return removed
+
+
+# Список публичных методов вычисляется один раз при импорте из словаря
+# класса: без dir() с сортировкой, унаследованных имен и дескрипторного
+# getattr на каждую запись.
+VMManager._PUBLIC_METHODS = tuple(
+    name for name, value in vars(VMManager).items()
+    if not name.startswith("_") and callable(value)
+)
+
+
+# Реестр менеджеров по клиенту: на каждый ProxmoxClient ровно один
+# VMManager (и значит один общий кэш, single-flight и индексы), а не
+# первый попавшийся клиент навсегда. Слабые ссылки не держат менеджеры
+# отработавших клиентов в памяти.
+_vm_manager_registry: "weakref.WeakValueDictionary[int, VMManager]" = \
+    weakref.WeakValueDictionary()
+
+
+def get_vm_manager(proxmox_client: ProxmoxClient) -> VMManager:
+    """Получить менеджер виртуальных машин для указанного клиента."""
+    manager = _vm_manager_registry.get(id(proxmox_client))
+    if manager is None:
+        manager = VMManager(proxmox_client)
+        _vm_manager_registry[id(proxmox_client)] = manager
+    return manager
+
+
+if __name__ == "__main__":
+    print("Публичные методы VMManager:")
+    for method in VMManager._PUBLIC_METHODS:
+        print(f"  - {method}")
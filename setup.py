@@ -0,0 +1,32 @@
+"""Сборка пакета.
+
+По умолчанию пакет ставится как чистый Python. Горячий путь разбора
+сетевых алиасов можно скомпилировать через mypyc (AOT), задав переменную
+окружения ``DEPLOY_STAND_MYPYC=1`` при сборке:
+
+    DEPLOY_STAND_MYPYC=1 pip install -e .
+
+Публичный API модулей при этом не меняется.
+"""
+
+import os
+
+from setuptools import find_packages, setup
+
+ext_modules = []
+if os.environ.get("DEPLOY_STAND_MYPYC") == "1":
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify(
+        ["newest_project/core/modules/network_manager.py"],
+        opt_level="3",
+    )
+
+setup(
+    name="deploy-stand",
+    version="1.0.0",
+    description="Система автоматизированного развертывания VM в кластере Proxmox VE",
+    packages=find_packages(include=["newest_project", "newest_project.*"]),
+    python_requires=">=3.9",
+    ext_modules=ext_modules,
+)